@@ -0,0 +1,54 @@
+"""verification queue index, email outbox, registration idempotency key
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("idempotency_key", sa.String(), nullable=True))
+    op.create_unique_constraint("users_idempotency_key_key", "users", ["idempotency_key"])
+
+    op.create_index("ix_payment_proofs_user_id", "payment_proofs", ["user_id"])
+    op.create_index(
+        "ix_payment_proofs_status_submitted_at", "payment_proofs", ["status", "submitted_at", "id"]
+    )
+
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("recipient", sa.String(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("text_body", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_email_outbox_status_next_attempt_at", "email_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_status_next_attempt_at", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    op.drop_index("ix_payment_proofs_status_submitted_at", table_name="payment_proofs")
+    op.drop_index("ix_payment_proofs_user_id", table_name="payment_proofs")
+    op.drop_constraint("users_idempotency_key_key", "users", type_="unique")
+    op.drop_column("users", "idempotency_key")
@@ -0,0 +1,36 @@
+"""payment proof storage key
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("payment_proofs", sa.Column("storage_key", sa.String(), nullable=True))
+    # Recover keys of existing proofs from their URLs: local uploads are
+    # served under .../static/<key>, S3 and CloudFront URLs are https://<host>/<key>
+    op.execute(
+        "UPDATE payment_proofs SET storage_key = substring(file_path from '/static/(.*)$') "
+        "WHERE file_path LIKE '%/static/%'"
+    )
+    op.execute(
+        "UPDATE payment_proofs SET storage_key = substring(file_path from '^https?://[^/]+/(.*)$') "
+        "WHERE storage_key IS NULL AND file_path ~ '^https?://'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("payment_proofs", "storage_key")
@@ -0,0 +1,69 @@
+"""content-addressed file blobs and references
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "file_blobs",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("sha256", sa.String(), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("last_referenced_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_file_blobs_last_referenced_at", "file_blobs", ["last_referenced_at"])
+
+    op.create_table(
+        "file_refs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("blob_key", sa.String(), sa.ForeignKey("file_blobs.key"), nullable=False),
+        sa.Column("owner_type", sa.String(), nullable=False),
+        sa.Column("owner_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_file_refs_blob_key", "file_refs", ["blob_key"])
+    op.create_index("ix_file_refs_owner", "file_refs", ["owner_type", "owner_id"])
+
+    # Existing uploads become blobs (without a content hash) with one reference each
+    op.execute(
+        "INSERT INTO file_blobs (key) SELECT DISTINCT storage_key FROM payment_proofs "
+        "WHERE storage_key IS NOT NULL ON CONFLICT DO NOTHING"
+    )
+    op.execute(
+        "INSERT INTO file_blobs (key, size, content_type) SELECT storage_key, size_bytes, content_type FROM videos "
+        "ON CONFLICT DO NOTHING"
+    )
+    op.execute(
+        "INSERT INTO file_refs (id, blob_key, owner_type, owner_id) "
+        "SELECT gen_random_uuid(), storage_key, 'payment_proof', id FROM payment_proofs WHERE storage_key IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO file_refs (id, blob_key, owner_type, owner_id) "
+        "SELECT gen_random_uuid(), storage_key, 'video', id FROM videos"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_file_refs_owner", table_name="file_refs")
+    op.drop_index("ix_file_refs_blob_key", table_name="file_refs")
+    op.drop_table("file_refs")
+    op.drop_index("ix_file_blobs_last_referenced_at", table_name="file_blobs")
+    op.drop_table("file_blobs")
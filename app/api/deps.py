@@ -1,17 +1,61 @@
-from typing import Generator
+import time
+from typing import Any, Dict, Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import make_transient_to_detached
 from app.core import security, config
+from app.core.cache import TTLCache
 from app.core.database import get_db
 from app.models import user as models
 from app.schemas import user as schemas
+from app.services.catalog import entitlements
+from app.services.revocation import revocation_list
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{config.settings.api_v1_prefix}/auth/login")
 
+# Resolved users keyed by token subject. Entries never outlive the token that
+# produced them and are dropped whenever the user row is changed.
+principal_cache = TTLCache(
+    maxsize=config.settings.principal_cache_size,
+    ttl=config.settings.principal_cache_ttl_seconds,
+)
+
+# Bumped by invalidate_principal; a lookup that raced with an invalidation
+# does not cache the row it read before the change was committed. One
+# counter for every user: a lookup concurrent with any invalidation just
+# goes uncached, and nothing is kept per user outside principal_cache.
+_principal_generation = 0
+
+# Not kept in memory; change_password reads it from the database
+_UNCACHED_COLUMNS = {"hashed_password"}
+
+def _snapshot_user(user: models.User) -> Dict[str, Any]:
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(models.User).column_attrs
+        if attr.key not in _UNCACHED_COLUMNS
+    }
+
+def _restore_user(values: Dict[str, Any]) -> models.User:
+    # Detached instance with a persistent identity: it can be added to the
+    # request session and updated without being re-selected first.
+    user = models.User(**values)
+    make_transient_to_detached(user)
+    return user
+
+def invalidate_principal(email: str) -> None:
+    """Drop the cached user in this worker. Other workers keep serving their
+    copy (e.g. of a deactivated or no longer entitled user) until it expires
+    after principal_cache_ttl_seconds; only deactivation is enforced across
+    workers at once, through revocation_list.revoke_subject."""
+    global _principal_generation
+    _principal_generation += 1
+    principal_cache.delete(email)
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> models.User:
@@ -26,15 +70,29 @@ async def get_current_user(
             detail="Could not validate credentials",
         )
     user_email = token_data.sub if token_data.sub else token_data.email
-    if not user_email:
+    if not user_email or payload.get("type", "access") != "access":
          raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    # In-memory check, before the principal cache so a revoked token is never served from it
+    if revocation_list.is_revoked(payload.get("jti"), user_email, payload.get("iat")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+    cached = principal_cache.get(user_email)
+    if cached is not None:
+        return _restore_user(cached)
+
+    generation = _principal_generation
     result = await db.execute(select(models.User).where(models.User.email == user_email))
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if _principal_generation == generation:
+        ttl = payload["exp"] - time.time() if "exp" in payload else None
+        principal_cache.set(user_email, _snapshot_user(user), ttl=ttl)
     return user
 
 def get_current_active_user(
@@ -52,3 +110,14 @@ def get_current_admin(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+async def get_current_entitled_user(
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+) -> models.User:
+    """Active users with an approved payment, plus admins, may access course content."""
+    if current_user.role == models.UserRole.ADMIN:
+        return current_user
+    if not await entitlements.contains(db, current_user.id):
+        raise HTTPException(status_code=403, detail="An approved payment is required to access course content")
+    return current_user
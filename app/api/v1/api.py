@@ -1,7 +1,9 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, registration, admin
+from app.api.v1.endpoints import auth, registration, admin, videos, media
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(registration.router, prefix="/registration", tags=["registration"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
+api_router.include_router(videos.router, prefix="/videos", tags=["videos"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
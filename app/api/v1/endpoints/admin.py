@@ -1,36 +1,300 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import base64
+import csv
+import io
+import re
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Literal, Optional, Tuple
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, tuple_, update
 from uuid import UUID
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import contains_eager, selectinload
 
 from app.api import deps
 from app.models import user as models
 from app.schemas import user as schemas
 from app.core import security
-from app.services.email import send_welcome_email, send_rejection_email
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, pool_stats
+from app.core.logging import log_stats
+from app.core.responses import model_response
+from app.services.catalog import entitlements, video_catalog
+from app.services.storage import upload_metrics
+from app.services.events import verification_events
+from app.services.email import send_email, render_welcome_email, queue_welcome_email, queue_rejection_email
+from app.services.images import image_pipeline
+from app.services.outbox import outbox_sender
+from app.services.revocation import revocation_list, revoke_refresh_tokens
 
 router = APIRouter()
 
-@router.get("/verifications", response_model=List[schemas.UserResponse])
+def _encode_cursor(submitted_at: datetime, proof_id: UUID) -> str:
+    raw = f"{submitted_at.isoformat()}|{proof_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        submitted_at, proof_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(submitted_at), UUID(proof_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/verifications", response_model=schemas.VerificationPage)
 async def get_pending_verifications(
+    status: models.PaymentStatus = models.PaymentStatus.PENDING,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     db: AsyncSession = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_admin),
 ) -> Any:
-    # return users where payment proof is pending
-    # This join might need optimization but works for small scale
-    query = select(models.User).join(models.PaymentProof).where(
-        models.PaymentProof.status == models.PaymentStatus.PENDING
-    ).options(selectinload(models.User.payment_proof))
+    # Keyset pagination over ix_payment_proofs_status_submitted_at, oldest first.
+    # The proof is loaded by the same join instead of a second selectin query.
+    proof = models.PaymentProof
+    query = (
+        select(models.User)
+        .join(models.User.payment_proof)
+        .where(proof.status == status)
+        .options(contains_eager(models.User.payment_proof))
+        .order_by(proof.submitted_at, proof.id)
+        .limit(limit + 1)
+    )
+    if submitted_from:
+        query = query.where(proof.submitted_at >= submitted_from)
+    if submitted_to:
+        query = query.where(proof.submitted_at < submitted_to)
+    if cursor:
+        after_submitted_at, after_id = _decode_cursor(cursor)
+        query = query.where(tuple_(proof.submitted_at, proof.id) > tuple_(after_submitted_at, after_id))
+
     result = await db.execute(query)
     users = result.scalars().all()
-    return users
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        last = users[-1].payment_proof
+        next_cursor = _encode_cursor(last.submitted_at, last.id)
+    return model_response(
+        schemas.VerificationPage, {"items": users, "next_cursor": next_cursor}, trusted=True
+    )
+
+@router.get("/verifications/events")
+async def stream_verification_events(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_admin),
+) -> Any:
+    # Server-sent events: "registered" carries a new queue item in the shape
+    # of GET /verifications, "decided" the users that left the queue. After
+    # "ready" (or "reset") clients load the queue once and then apply deltas.
+    # The session only served authentication; release its connection rather
+    # than hold it for the life of the stream.
+    await db.close()
+    # Streams end after one access token lifetime, so an admin whose access is
+    # revoked stops receiving events; clients reconnect with Last-Event-ID.
+    return StreamingResponse(
+        verification_events.stream(last_event_id, max_seconds=settings.access_token_expire_minutes * 60),
+        media_type="text/event-stream",
+        headers={"cache-control": "no-cache", "x-accel-buffering": "no"},
+    )
+
+EXPORT_COLUMNS = (
+    ("user_id", models.User.id),
+    ("email", models.User.email),
+    ("is_active", models.User.is_active),
+    ("registered_at", models.User.created_at),
+    ("first_name", models.StudentProfile.first_name),
+    ("last_name", models.StudentProfile.last_name),
+    ("phone", models.StudentProfile.phone),
+    ("location", models.StudentProfile.location),
+    ("payment_status", models.PaymentProof.status),
+    ("submitted_at", models.PaymentProof.submitted_at),
+)
+EXPORT_BATCH_SIZE = 1000
+# Digits with phone punctuation (+977-98..., (01) 555 0100) cannot call a
+# function or reach another cell, so they are exported unchanged
+PHONE_LIKE = re.compile(r"[+-]?[\d\s().-]*\d[\d\s().-]*")
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Keep spreadsheet apps from evaluating user-supplied text as a formula
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        if not PHONE_LIKE.fullmatch(value):
+            return "'" + value
+    return value
+
+async def _export_rows(format: str, status: Optional[models.PaymentStatus]) -> AsyncIterator[bytes]:
+    # Plain columns rather than ORM entities so nothing accumulates in the
+    # identity map; yield_per streams from a server-side cursor in batches.
+    query = (
+        select(*(column for _, column in EXPORT_COLUMNS))
+        .outerjoin(models.StudentProfile, models.StudentProfile.user_id == models.User.id)
+        .outerjoin(models.PaymentProof, models.PaymentProof.user_id == models.User.id)
+        .where(models.User.role == models.UserRole.STUDENT.value)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if status:
+        query = query.where(models.PaymentProof.status == status.value)
+    names = [name for name, _ in EXPORT_COLUMNS]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(names)
+        yield buffer.getvalue().encode()
+    # Its own session: the request's session is closed before streaming starts
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            if format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_csv_cell(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode()
+            else:
+                yield b"".join(orjson.dumps(dict(zip(names, row))) + b"\n" for row in rows)
+
+@router.get("/students/export")
+async def export_students(
+    format: Literal["csv", "ndjson"] = "csv",
+    status: Optional[models.PaymentStatus] = None,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_admin),
+) -> Any:
+    # Release the authentication session's connection; the export uses its own
+    await db.close()
+    filename = f"students-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    return StreamingResponse(
+        _export_rows(format, status),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"content-disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/verify/bulk", response_model=schemas.BulkVerificationResponse)
+async def verify_students_bulk(
+    payload: schemas.BulkVerificationRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_admin),
+) -> Any:
+    requested = {item.user_id: item for item in payload.items}
+    if len(requested) != len(payload.items):
+        raise HTTPException(status_code=422, detail="Each user may appear only once in a bulk verification.")
+
+    # Credentials for the approvals that are pending now are hashed before any
+    # row is locked and with the connection released. Proofs only ever leave
+    # PENDING, so the locked re-check below can only shrink this set.
+    approve_ids = [user_id for user_id, item in requested.items() if item.action == "approve"]
+    pending_ids = []
+    if approve_ids:
+        result = await db.execute(
+            select(models.PaymentProof.user_id).where(
+                models.PaymentProof.user_id.in_(approve_ids),
+                models.PaymentProof.status == models.PaymentStatus.PENDING,
+            )
+        )
+        pending_ids = result.scalars().all()
+        await db.rollback()
+    temp_passwords = {user_id: security.generate_temp_password() for user_id in pending_ids}
+    # Half the hashing workers at most, leaving room for logins and registrations
+    hashes = dict(zip(temp_passwords, await security.get_password_hashes_async(
+        list(temp_passwords.values()), concurrency=max(1, security.password_hash_pool.max_workers // 2)
+    )))
+
+    # One locked load for the whole batch; the conditional update of a
+    # concurrent single verification of the same proof waits for this
+    # transaction and then finds the proof no longer pending.
+    result = await db.execute(
+        select(models.User, models.PaymentProof)
+        .join(models.User.payment_proof)
+        .where(models.User.id.in_(requested.keys()))
+        .with_for_update(of=models.PaymentProof)
+    )
+    rows = {user.id: (user, proof) for user, proof in result.all()}
+
+    results: List[schemas.BulkVerificationResult] = []
+    to_approve = []
+    to_reject = []
+    for user_id, item in requested.items():
+        row = rows.get(user_id)
+        if row is None:
+            results.append(schemas.BulkVerificationResult(
+                user_id=user_id, status="not_found", detail="User or payment proof not found"
+            ))
+            continue
+        user, proof = row
+        if proof.status != models.PaymentStatus.PENDING:
+            results.append(schemas.BulkVerificationResult(
+                user_id=user_id, status="skipped", detail=f"Already processed. Current status: {proof.status}"
+            ))
+            continue
+        (to_approve if item.action == "approve" else to_reject).append((user, proof, item))
+
+    if to_approve:
+        await db.execute(
+            update(models.User),
+            [
+                {"id": user.id, "hashed_password": hashes[user.id], "is_active": True, "must_change_password": True}
+                for user, _, _ in to_approve
+            ],
+        )
+        await db.execute(
+            update(models.PaymentProof)
+            .where(models.PaymentProof.id.in_([proof.id for _, proof, _ in to_approve]))
+            .values(status=models.PaymentStatus.APPROVED)
+        )
+    if to_reject:
+        await db.execute(
+            update(models.PaymentProof)
+            .where(models.PaymentProof.id.in_([proof.id for _, proof, _ in to_reject]))
+            .values(status=models.PaymentStatus.REJECTED)
+        )
+    for user, _, _ in to_approve:
+        queue_welcome_email(db, user.email, temp_passwords[user.id])
+    for user, _, item in to_reject:
+        queue_rejection_email(db, user.email, item.reason)
+    await db.commit()
+    outbox_sender.notify()
+    decided = [{"user_id": str(user.id), "status": "approved"} for user, _, _ in to_approve]
+    decided += [{"user_id": str(user.id), "status": "rejected"} for user, _, _ in to_reject]
+    if decided:
+        await verification_events.publish("decided", {"items": decided})
+
+    for user, _, _ in to_approve:
+        deps.invalidate_principal(user.email)
+        entitlements.grant(user.id)
+        results.append(schemas.BulkVerificationResult(user_id=user.id, status="approved"))
+    for user, _, _ in to_reject:
+        deps.invalidate_principal(user.email)
+        entitlements.revoke(user.id)
+        results.append(schemas.BulkVerificationResult(user_id=user.id, status="rejected"))
+
+    return {"results": results}
+
+async def _claim_pending_proof(db: AsyncSession, user_id: UUID, status: models.PaymentStatus) -> bool:
+    """Move the user's proof out of PENDING; False if another verification got there first."""
+    result = await db.execute(
+        update(models.PaymentProof)
+        .where(
+            models.PaymentProof.user_id == user_id,
+            models.PaymentProof.status == models.PaymentStatus.PENDING,
+        )
+        .values(status=status)
+        .returning(models.PaymentProof.id)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        return False
+    return True
 
 @router.post("/verify/{user_id}")
 async def verify_student(
     user_id: UUID,
-    background_tasks: BackgroundTasks,
     action: str = "approve", # approve or reject
     reason: str = "",
     db: AsyncSession = Depends(deps.get_db),
@@ -56,41 +320,92 @@ async def verify_student(
         )
 
     if action == "approve":
-        # Generate Creds
+        # Generate Creds (before the proof is claimed, so no lock is held while hashing)
         temp_password = security.generate_temp_password()
-        hashed = security.get_password_hash(temp_password)
-        
+        hashed = await security.get_password_hash_async(temp_password)
+
+        # Claim the proof: only one of several concurrent verifications
+        # (single or bulk) gets the row back and sends credentials
+        if not await _claim_pending_proof(db, user_id, models.PaymentStatus.APPROVED):
+            raise HTTPException(status_code=400, detail="This user has already been processed.")
+
         # Update User
         user.hashed_password = hashed
         user.is_active = True
         user.must_change_password = True
-        
-        # Update Proof
-        payment_proof.status = models.PaymentStatus.APPROVED
-        
         db.add(user)
-        db.add(payment_proof)
+        # Email is committed together with the approval
+        queue_welcome_email(db, user.email, temp_password)
         await db.commit()
-        
-        # Send Email
-        background_tasks.add_task(send_welcome_email, user.email, temp_password)
+        deps.invalidate_principal(user.email)
+        entitlements.grant(user.id)
+        outbox_sender.notify()
+        await verification_events.publish("decided", {"items": [{"user_id": str(user.id), "status": "approved"}]})
         return {"message": "User approved and email sent."}
         
     elif action == "reject":
-        payment_proof.status = models.PaymentStatus.REJECTED
         # Optionally we could delete the user or keep them inactive
         # For now, we keep them inactive
-        
-        db.add(payment_proof)
+        if not await _claim_pending_proof(db, user_id, models.PaymentStatus.REJECTED):
+            raise HTTPException(status_code=400, detail="This user has already been processed.")
+        queue_rejection_email(db, user.email, reason)
         await db.commit()
+        deps.invalidate_principal(user.email)
+        entitlements.revoke(user.id)
+        outbox_sender.notify()
+        await verification_events.publish("decided", {"items": [{"user_id": str(user.id), "status": "rejected"}]})
         
-        background_tasks.add_task(send_rejection_email, user.email, reason)
         return {"message": "User rejected and email sent."}
 
+@router.post("/users/{user_id}/deactivate", response_model=schemas.UserResponse)
+async def deactivate_user(
+    user_id: UUID,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_admin),
+) -> Any:
+    result = await db.execute(
+        select(models.User).where(models.User.id == user_id).options(selectinload(models.User.payment_proof))
+    )
+    user = result.scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.id == current_user.id:
+        raise HTTPException(status_code=400, detail="You cannot deactivate your own account")
+
+    user.is_active = False
+    db.add(user)
+    # Cut off existing sessions now rather than when their tokens expire
+    revocation_list.revoke_subject(db, user.email)
+    await db.execute(revoke_refresh_tokens(user_id=user.id))
+    await db.commit()
+    deps.invalidate_principal(user.email)
+    entitlements.revoke(user.id)
+    return user
+
+@router.get("/stats")
+async def get_stats(
+    current_user: models.User = Depends(deps.get_current_admin),
+) -> Any:
+    return {
+        "database_pool": pool_stats(),
+        "password_hashing": security.password_hash_pool.stats(),
+        "principal_cache": deps.principal_cache.stats(),
+        "uploads": upload_metrics.stats(),
+        "images": image_pipeline.stats(),
+        "email_outbox": outbox_sender.stats(),
+        "logging": log_stats(),
+        "admission": admission.stats(),
+        "token_revocations": revocation_list.stats(),
+        "video_catalog": video_catalog.stats(),
+        "entitlements": entitlements.stats(),
+        "verification_events": verification_events.stats(),
+    }
+
 @router.post("/test-email")
 async def test_email(email: str = "sandesh@example.com"):
     try:
-        await send_welcome_email(email, "TEST_PASSWORD_123")
+        rendered = render_welcome_email(email, "TEST_PASSWORD_123")
+        await send_email(rendered.subject, [email], rendered.html)
         return {"message": f"Test email sent to {email}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,33 +1,108 @@
-from datetime import timedelta
-from typing import Any
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from uuid import UUID, uuid4
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core import security, config
+from app.core.admission import rate_limit_form_field
 from app.api import deps
 from app.schemas import user as schemas
 from app.models import user as models
+from app.models.token import RefreshToken
+from app.services.revocation import revocation_list, revoke_refresh_tokens
 
 router = APIRouter()
 
-@router.post("/login", response_model=schemas.Token)
+def _issue_tokens(db: AsyncSession, user: models.User, family_id: Optional[UUID] = None) -> dict:
+    """Access token plus a new refresh token in ``family_id`` (a new family for a fresh login).
+    The refresh token row is committed by the caller."""
+    access_token = security.create_access_token(
+        subject=user.email, expires_delta=timedelta(minutes=config.settings.access_token_expire_minutes)
+    )
+    refresh_token, token_hash = security.create_refresh_token()
+    db.add(RefreshToken(
+        token_hash=token_hash,
+        user_id=user.id,
+        family_id=family_id or uuid4(),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=config.settings.refresh_token_expire_days),
+    ))
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post(
+    "/login", response_model=schemas.Token, dependencies=[Depends(rate_limit_form_field("login", "username"))]
+)
 async def login_access_token(
     db: AsyncSession = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     result = await db.execute(select(models.User).where(models.User.email == form_data.username))
     user = result.scalars().first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user or not await security.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
         
-    access_token_expires = timedelta(minutes=config.settings.access_token_expire_minutes)
-    access_token = security.create_access_token(
-        subject=user.email, expires_delta=access_token_expires
+    tokens = _issue_tokens(db, user)
+    await db.commit()
+    return tokens
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(
+    refresh_in: schemas.RefreshRequest,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    result = await db.execute(
+        select(RefreshToken, models.User)
+        .join(models.User, models.User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == security.hash_refresh_token(refresh_in.refresh_token))
+        .with_for_update(of=RefreshToken)
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    row = result.first()
+    if row is None:
+        raise invalid
+    token, user = row
+
+    if token.revoked_at is not None:
+        # A rotated-out token presented again means it was copied: end the
+        # whole login session, including the current holder's token.
+        await db.execute(revoke_refresh_tokens(family_id=token.family_id))
+        await db.commit()
+        raise invalid
+    if token.expires_at < datetime.now(timezone.utc) or not user.is_active:
+        raise invalid
+
+    # Rotate: each refresh token is good for exactly one use
+    token.revoked_at = datetime.now(timezone.utc)
+    tokens = _issue_tokens(db, user, family_id=token.family_id)
+    await db.commit()
+    return tokens
+
+@router.post("/logout")
+async def logout(
+    refresh_in: Optional[schemas.RefreshRequest] = None,
+    token: str = Depends(deps.oauth2_scheme),
+    current_user: models.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    payload = jwt.get_unverified_claims(token) # already verified by get_current_user
+    if payload.get("jti"):
+        revocation_list.revoke_token(db, payload["jti"], datetime.fromtimestamp(payload["exp"], timezone.utc))
+    if refresh_in is not None:
+        result = await db.execute(
+            select(RefreshToken.family_id).where(
+                RefreshToken.token_hash == security.hash_refresh_token(refresh_in.refresh_token),
+                RefreshToken.user_id == current_user.id,
+            )
+        )
+        family_id = result.scalar_one_or_none()
+        if family_id is not None:
+            await db.execute(revoke_refresh_tokens(family_id=family_id))
+    await db.commit()
+    return {"message": "Logged out."}
 
 @router.post("/change-password", response_model=schemas.UserResponse)
 async def change_password(
@@ -35,12 +110,20 @@ async def change_password(
     current_user: models.User = Depends(deps.get_current_user),
     db: AsyncSession = Depends(deps.get_db),
 ) -> Any:
-    if not security.verify_password(password_in.old_password, current_user.hashed_password):
+    # The principal cache does not hold password hashes
+    result = await db.execute(select(models.User.hashed_password).where(models.User.id == current_user.id))
+    if not await security.verify_password_async(password_in.old_password, result.scalar_one()):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
-    current_user.hashed_password = security.get_password_hash(password_in.new_password)
+    current_user.hashed_password = await security.get_password_hash_async(password_in.new_password)
     current_user.must_change_password = False
     db.add(current_user)
+    # Sessions signed in with the old password end now: their access tokens
+    # are revoked and they cannot renew with their refresh tokens. Tokens
+    # from logging in with the new password are issued after the cutoff.
+    revocation_list.revoke_subject(db, current_user.email)
+    await db.execute(revoke_refresh_tokens(user_id=current_user.id))
     await db.commit()
+    deps.invalidate_principal(current_user.email)
     await db.refresh(current_user)
     return current_user
@@ -0,0 +1,76 @@
+import os
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+
+from app.core import security
+from app.core.config import settings
+from app.core.static_files import file_response
+from app.services.images import VARIANTS, derived_key, image_pipeline
+from app.services.storage import LocalStorageService, StorageService, get_storage_service
+
+router = APIRouter()
+
+# Only uploads in these directories have derived images
+SOURCE_DIRECTORIES = ("payment_proofs",)
+# Serves the upload itself; its directory is private under /static
+ORIGINAL = "original"
+
+@router.get("/{variant}/{key:path}")
+async def get_derived_image(
+    variant: str,
+    key: str,
+    request: Request,
+    expires: int,
+    signature: str,
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    # Links come signed in the admin verification queue (<img> tags cannot
+    # send a bearer token); nothing touches storage before this check
+    if not security.verify_media_signature(f"{variant}/{key}", expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+    parts = key.split("/")
+    if (
+        (variant not in VARIANTS and variant != ORIGINAL)
+        or parts[0] not in SOURCE_DIRECTORIES
+        or "derived" in parts
+        or ".." in parts
+    ):
+        raise HTTPException(status_code=404, detail="Not found")
+    if variant == ORIGINAL:
+        target = key
+    # Normally already rendered after upload; otherwise rendered now
+    elif await image_pipeline.ensure(key):
+        target = derived_key(key, variant)
+    else:
+        raise HTTPException(status_code=404, detail="Preview not available")
+    cache_control = settings.static_cache_control.get(parts[0], "private, max-age=86400")
+    if not isinstance(storage_service, LocalStorageService):
+        # The browser fetches the object (for previews, the much smaller
+        # derived one) from S3/CloudFront directly
+        return RedirectResponse(
+            storage_service.signed_url(target, settings.media_url_expire_seconds),
+            status_code=307,
+            headers={"cache-control": "private, max-age=60"},
+        )
+
+    path = os.path.join(storage_service.base_path, target)
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        if variant == ORIGINAL:
+            raise HTTPException(status_code=404, detail="Not found")
+        # Deleted since it was generated: render it again
+        image_pipeline.forget(key)
+        if not await image_pipeline.ensure(key):
+            raise HTTPException(status_code=404, detail="Preview not available")
+        stat_result = await run_in_threadpool(os.stat, path)
+    return file_response(
+        path,
+        stat_result,
+        request.headers,
+        extra_headers={"cache-control": cache_control},
+        media_type=None if variant == ORIGINAL else "image/jpeg",
+        offload_path=f"{settings.static_offload_prefix.rstrip('/')}/{target}",
+    )
@@ -1,70 +1,156 @@
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, BackgroundTasks
+from typing import Any, Optional
+from uuid import uuid4
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.core import security
+from app.core.admission import rate_limit_form_field
 from app.api import deps
-from app.services.storage import storage_service
-from app.services.email import send_registration_received_email
+from app.services.storage import StorageService, get_storage_service
+from app.services.email import render_registration_received_email
+from app.services.events import verification_events
+from app.services.images import image_pipeline
+from app.services.outbox import outbox_sender
 from app.models import user as models
+from app.schemas import user as schemas
+from app.models.file import FileOwner, FileRef
+from app.models.outbox import EmailOutbox
+from app.services.files import ensure_stored, upsert_blob
 
 router = APIRouter()
 
-@router.post("/register")
+REGISTRATION_RESPONSE = {"message": "Registration successful. Please wait for admin approval."}
+
+def _insert_from_user(model, user_cte, values: dict):
+    # INSERT ... SELECT <values> FROM new_user: a no-op when the user insert
+    # hit a conflict and returned no row.
+    table = model.__table__
+    columns = list(values)
+    selected = [literal(value, table.c[name].type) for name, value in values.items()]
+    if "user_id" in table.c:
+        columns.append("user_id")
+        selected.append(user_cte.c.id)
+    return insert(model).from_select(columns, select(*selected).select_from(user_cte))
+
+@router.post("/register", dependencies=[Depends(rate_limit_form_field("register", "email"))])
 async def register_student(
-    background_tasks: BackgroundTasks,
     first_name: str = Form(...),
     last_name: str = Form(...),
     email: str = Form(...),
     phone: str = Form(...),
     location: str = Form(...),
     payment_proof: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(deps.get_db),
+    storage_service: StorageService = Depends(get_storage_service),
 ) -> Any:
-    # Check if user exists
-    result = await db.execute(select(models.User).where(models.User.email == email))
-    user = result.scalars().first()
-    if user:
+    # A retried request with a key we have already seen is answered without
+    # re-uploading anything.
+    if idempotency_key:
+        result = await db.execute(
+            select(models.User.email).where(models.User.idempotency_key == idempotency_key)
+        )
+        existing_email = result.scalar_one_or_none()
+        if existing_email is not None:
+            if existing_email != email:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different registration.")
+            return REGISTRATION_RESPONSE
+
+    # Save File first so an oversized upload is rejected before any rows exist
+    stored = await storage_service.save_file(payment_proof, directory="payment_proofs")
+
+    # User, profile, proof and the confirmation email are written by one
+    # statement. Duplicates are caught by the unique constraints rather than a
+    # separate existence check.
+    new_user = (
+        pg_insert(models.User)
+        .values(
+            id=uuid4(),
+            email=email,
+            hashed_password=await security.get_unusable_password_hash(), # Not usable until active
+            role=models.UserRole.STUDENT,
+            is_active=False,
+            must_change_password=False,
+            idempotency_key=idempotency_key,
+        )
+        .on_conflict_do_nothing()
+        .returning(models.User.id)
+        .cte("new_user")
+    )
+    new_profile = _insert_from_user(models.StudentProfile, new_user, {
+        "id": uuid4(),
+        "first_name": first_name,
+        "last_name": last_name,
+        "phone": phone,
+        "location": location,
+    }).cte("new_profile")
+    proof_id = uuid4()
+    new_proof = _insert_from_user(models.PaymentProof, new_user, {
+        "id": proof_id,
+        "file_path": stored.url,
+        "storage_key": stored.key,
+        "status": models.PaymentStatus.PENDING.value,
+    }).returning(models.PaymentProof.submitted_at).cte("new_proof")
+    # The blob row is written (and locked until commit) even if the user
+    # insert conflicts; without a reference it is reclaimed by scripts/gc_blobs.py
+    new_blob = upsert_blob(stored, payment_proof.content_type).cte("new_blob")
+    new_ref = _insert_from_user(FileRef, new_user, {
+        "id": uuid4(),
+        "blob_key": stored.key,
+        "owner_type": FileOwner.PAYMENT_PROOF.value,
+        "owner_id": proof_id,
+    }).cte("new_ref")
+    confirmation = render_registration_received_email(f"{first_name} {last_name}")
+    new_email = _insert_from_user(EmailOutbox, new_user, {
+        "id": uuid4(),
+        "recipient": email,
+        "subject": confirmation.subject,
+        "body": confirmation.html,
+        "text_body": confirmation.text,
+    }).cte("new_email")
+
+    result = await db.execute(
+        select(new_user.c.id, new_proof.c.submitted_at).add_cte(new_profile, new_blob, new_ref, new_email)
+    )
+    created = result.first()
+    await ensure_stored(storage_service, stored, payment_proof, "payment_proofs")
+    await db.commit()
+
+    if created is None:
+        # The file is not deleted here: identical bytes may belong to another upload
+        if idempotency_key:
+            # A concurrent retry of this same request may have won the race
+            result = await db.execute(
+                select(models.User.email).where(models.User.idempotency_key == idempotency_key)
+            )
+            if result.scalar_one_or_none() == email:
+                return REGISTRATION_RESPONSE
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-        
-    # Create User (Inactive)
-    user = models.User(
+
+    outbox_sender.notify()
+    # New item for open admin verification queues, in the shape they list it
+    queued = models.User(
+        id=created.id,
         email=email,
-        hashed_password=security.get_password_hash("temp123"), # Not usable until active
-        role=models.UserRole.STUDENT,
+        role=models.UserRole.STUDENT.value,
         is_active=False,
+        must_change_password=False,
+        payment_proof=models.PaymentProof(
+            id=proof_id,
+            file_path=stored.url,
+            storage_key=stored.key,
+            status=models.PaymentStatus.PENDING.value,
+            submitted_at=created.submitted_at,
+        ),
     )
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    
-    # Create Profile
-    profile = models.StudentProfile(
-        user_id=user.id,
-        first_name=first_name,
-        last_name=last_name,
-        phone=phone,
-        location=location
-    )
-    db.add(profile)
-    
-    # Save File
-    file_path = await storage_service.save_file(payment_proof, directory="payment_proofs")
-    
-    # Create Payment Proof Record
-    proof = models.PaymentProof(
-        user_id=user.id,
-        file_path=file_path,
-        status="pending"
+    await verification_events.publish(
+        "registered", schemas.UserResponse.model_validate(queued).model_dump(mode="json")
     )
-    db.add(proof)
-    await db.commit()
-    
-    # Send Registration Received Email
-    background_tasks.add_task(send_registration_received_email, email, f"{first_name} {last_name}")
-    
-    return {"message": "Registration successful. Please wait for admin approval."}
+    # Thumbnail and review copy for the admin queue, rendered in the background
+    image_pipeline.schedule(stored.key)
+    return REGISTRATION_RESPONSE
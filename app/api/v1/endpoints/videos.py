@@ -0,0 +1,432 @@
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Depends, HTTPException, File, Form, Header, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select, func
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.core.static_files import etag_matches, file_response
+from app.models import upload as upload_models
+from app.models.file import FileOwner, FileRef
+from app.models import user as user_models
+from app.models import video as models
+from app.schemas import video as schemas
+from app.services.catalog import video_catalog
+from app.services.files import delete_refs, ensure_stored, upsert_blob
+from app.services.storage import (
+    LocalStorageService,
+    StorageService,
+    StoredFile,
+    UploadedChunk,
+    content_key,
+    get_storage_service,
+)
+
+router = APIRouter()
+
+@router.get("", response_model=List[schemas.VideoResponse])
+async def list_videos(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_entitled_user),
+) -> Any:
+    # Served from the in-process catalog cache; with the principal cache and
+    # entitlement set warm this path runs no queries at all.
+    body, etag = await video_catalog.get(db, include_unpublished=current_user.role == user_models.UserRole.ADMIN)
+    headers = {"etag": etag, "cache-control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        video_catalog.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/{video_id}/stream-url", response_model=schemas.VideoStreamUrl)
+async def get_stream_url(
+    video_id: UUID,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_entitled_user),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    result = await db.execute(select(models.Video).where(models.Video.id == video_id))
+    video = result.scalars().first()
+    if not video or (not video.is_published and current_user.role != user_models.UserRole.ADMIN):
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    # The player uses this URL for every range/seek request until it expires;
+    # none of those requests touch the database or decode a JWT.
+    expires_in = settings.media_url_expire_seconds
+    return {
+        "url": storage_service.signed_url(video.storage_key, expires_in),
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+    }
+
+@router.get("/stream/{key:path}", include_in_schema=False)
+async def stream_video(
+    key: str,
+    request: Request,
+    expires: int,
+    signature: str,
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    if not isinstance(storage_service, LocalStorageService):
+        raise HTTPException(status_code=404, detail="Not found")
+    if not security.verify_media_signature(key, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+
+    base_path = os.path.realpath(storage_service.base_path)
+    path = os.path.realpath(os.path.join(base_path, key))
+    if not path.startswith(base_path + os.sep):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    max_age = max(expires - int(datetime.now(timezone.utc).timestamp()), 0)
+    return file_response(
+        path,
+        stat_result,
+        request.headers,
+        extra_headers={"cache-control": f"private, max-age={max_age}"},
+        offload_path=f"{settings.static_offload_prefix.rstrip('/')}/{key}",
+    )
+
+@router.post("", response_model=schemas.VideoResponse)
+async def create_video(
+    title: str = Form(...),
+    description: Optional[str] = Form(None),
+    position: int = Form(0),
+    duration_seconds: Optional[int] = Form(None),
+    is_published: bool = Form(True),
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    stored = await storage_service.save_file(
+        file, directory="videos", max_size=settings.max_video_upload_size_bytes
+    )
+    video = models.Video(
+        id=uuid4(),
+        title=title,
+        description=description,
+        position=position,
+        duration_seconds=duration_seconds,
+        is_published=is_published,
+        storage_key=stored.key,
+        content_type=file.content_type,
+        size_bytes=stored.size,
+    )
+    db.add(video)
+    await db.execute(upsert_blob(stored, file.content_type))
+    await ensure_stored(storage_service, stored, file, "videos", settings.max_video_upload_size_bytes)
+    db.add(FileRef(blob_key=stored.key, owner_type=FileOwner.VIDEO.value, owner_id=video.id))
+    await db.commit()
+    video_catalog.invalidate()
+    await db.refresh(video)
+    return video
+
+@router.patch("/{video_id}", response_model=schemas.VideoResponse)
+async def update_video(
+    video_id: UUID,
+    video_in: schemas.VideoUpdate,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+) -> Any:
+    result = await db.execute(select(models.Video).where(models.Video.id == video_id))
+    video = result.scalars().first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    for field, value in video_in.model_dump(exclude_unset=True).items():
+        setattr(video, field, value)
+    db.add(video)
+    await db.commit()
+    video_catalog.invalidate()
+    await db.refresh(video)
+    return video
+
+@router.delete("/{video_id}")
+async def delete_video(
+    video_id: UUID,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+) -> Any:
+    result = await db.execute(select(models.Video).where(models.Video.id == video_id))
+    video = result.scalars().first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    await db.delete(video)
+    # The file itself may be shared; scripts/gc_blobs.py removes it once unreferenced
+    await db.execute(delete_refs(FileOwner.VIDEO.value, video.id))
+    await db.commit()
+    video_catalog.invalidate()
+    return {"message": "Video deleted."}
+
+# Resumable uploads: create a session, PUT fixed-size chunks by index in any
+# order (and in parallel), query progress with HEAD/GET, then complete. Each
+# chunk is a short request, so a dropped connection costs at most one chunk.
+
+def _chunk_count(upload: upload_models.UploadSession) -> int:
+    return -(-upload.size // upload.chunk_size)
+
+def _upload_status(upload: upload_models.UploadSession, received: List[int]) -> dict:
+    contiguous = 0
+    for index in received:
+        if index != contiguous:
+            break
+        contiguous += 1
+    return {
+        "id": upload.id,
+        "filename": upload.filename,
+        "size": upload.size,
+        "chunk_size": upload.chunk_size,
+        "chunk_count": _chunk_count(upload),
+        "offset": min(contiguous * upload.chunk_size, upload.size),
+        "received_chunks": received,
+        "status": upload.status,
+        "expires_at": upload.expires_at,
+    }
+
+async def _get_upload(
+    db: AsyncSession, upload_id: UUID, lock: bool = False, shared: bool = False
+) -> upload_models.UploadSession:
+    query = select(upload_models.UploadSession).where(upload_models.UploadSession.id == upload_id)
+    if lock or shared:
+        query = query.with_for_update(read=shared)
+    result = await db.execute(query)
+    upload = result.scalars().first()
+    if not upload or (
+        upload.status == upload_models.UploadStatus.PENDING and upload.expires_at < datetime.now(timezone.utc)
+    ):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+async def _received_chunks(db: AsyncSession, upload_id: UUID) -> List[int]:
+    result = await db.execute(
+        select(upload_models.UploadChunk.index)
+        .where(upload_models.UploadChunk.session_id == upload_id)
+        .order_by(upload_models.UploadChunk.index)
+    )
+    return list(result.scalars().all())
+
+def _parse_checksum(header: str) -> bytes:
+    # tus checksum extension: "sha256 <base64 digest>"
+    algorithm, _, value = header.partition(" ")
+    if algorithm.lower() != "sha256":
+        raise HTTPException(status_code=400, detail="Only sha256 chunk checksums are supported")
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Malformed Upload-Checksum header")
+
+@router.post("/uploads", response_model=schemas.UploadStatusResponse, status_code=201)
+async def create_upload(
+    upload_in: schemas.UploadCreate,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    max_size = settings.max_video_upload_size_bytes
+    if upload_in.size > max_size:
+        raise HTTPException(status_code=413, detail=f"File is too large. Maximum size is {max_size} bytes.")
+
+    storage_key = f"videos/{uuid4()}_{os.path.basename(upload_in.filename)}"
+    backend_upload_id = await storage_service.start_chunked_upload(
+        storage_key, upload_in.size, upload_in.content_type
+    )
+    upload = upload_models.UploadSession(
+        created_by_id=current_user.id,
+        filename=upload_in.filename,
+        content_type=upload_in.content_type,
+        size=upload_in.size,
+        chunk_size=settings.resumable_chunk_size_bytes,
+        storage_key=storage_key,
+        backend_upload_id=backend_upload_id,
+        status=upload_models.UploadStatus.PENDING,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.resumable_upload_expire_hours),
+    )
+    db.add(upload)
+    await db.commit()
+    response.headers["location"] = f"{settings.api_v1_prefix}/videos/uploads/{upload.id}"
+    return _upload_status(upload, [])
+
+@router.head("/uploads/{upload_id}")
+async def get_upload_offset(
+    upload_id: UUID,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+) -> Response:
+    upload = await _get_upload(db, upload_id)
+    status = _upload_status(upload, await _received_chunks(db, upload.id))
+    return Response(
+        headers={
+            "upload-offset": str(status["offset"]),
+            "upload-length": str(upload.size),
+            "upload-chunk-size": str(upload.chunk_size),
+            "cache-control": "no-store",
+        }
+    )
+
+@router.get("/uploads/{upload_id}", response_model=schemas.UploadStatusResponse)
+async def get_upload(
+    upload_id: UUID,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+) -> Any:
+    upload = await _get_upload(db, upload_id)
+    return _upload_status(upload, await _received_chunks(db, upload.id))
+
+@router.put("/uploads/{upload_id}/chunks/{index}", status_code=204)
+async def put_upload_chunk(
+    upload_id: UUID,
+    index: int,
+    request: Request,
+    upload_checksum: Optional[str] = Header(None),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Response:
+    upload = await _get_upload(db, upload_id)
+    # Hand the connection back to the pool while the chunk body is received
+    await db.commit()
+    if upload.status != upload_models.UploadStatus.PENDING:
+        raise HTTPException(status_code=409, detail="Upload is already complete")
+    if not 0 <= index < _chunk_count(upload):
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+    offset = index * upload.chunk_size
+    expected = min(upload.chunk_size, upload.size - offset)
+    # Hashed as it arrives and spooled to disk past upload_chunk_size, so a
+    # request holds at most that much in memory whatever the chunk size
+    body = tempfile.SpooledTemporaryFile(max_size=settings.upload_chunk_size_bytes)
+    try:
+        sha256 = hashlib.sha256()
+        received = 0
+        async for piece in request.stream():
+            received += len(piece)
+            if received > expected:
+                raise HTTPException(status_code=413, detail=f"Chunk {index} must be {expected} bytes")
+            sha256.update(piece)
+            body.write(piece)
+        if received != expected:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes")
+
+        digest = sha256.digest()
+        if upload_checksum is not None and _parse_checksum(upload_checksum) != digest:
+            raise HTTPException(status_code=460, detail="Chunk checksum mismatch")
+
+        # Shared lock until the chunk is recorded: completion and cancellation
+        # take the row lock, so they wait for chunks being written and later
+        # chunks see the new status here instead of writing into a finished
+        # upload
+        upload = await _get_upload(db, upload_id, shared=True)
+        if upload.status != upload_models.UploadStatus.PENDING:
+            raise HTTPException(status_code=409, detail="Upload is already complete")
+        etag = await storage_service.write_chunk(
+            upload.storage_key, upload.backend_upload_id, index, offset, body, digest
+        )
+    finally:
+        body.close()
+    # A re-sent chunk replaces the earlier copy
+    values = {"size": expected, "sha256": digest.hex(), "etag": etag}
+    await db.execute(
+        insert(upload_models.UploadChunk)
+        .values(session_id=upload.id, index=index, **values)
+        .on_conflict_do_update(
+            index_elements=["session_id", "index"], set_={**values, "received_at": func.now()}
+        )
+    )
+    await db.commit()
+    return Response(status_code=204)
+
+@router.post("/uploads/{upload_id}/complete", response_model=schemas.VideoResponse)
+async def complete_upload(
+    upload_id: UUID,
+    video_in: schemas.UploadComplete,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    # Row lock: a retried or duplicate completion waits here and then sees COMPLETED
+    upload = await _get_upload(db, upload_id, lock=True)
+    if upload.status != upload_models.UploadStatus.PENDING:
+        raise HTTPException(status_code=409, detail="Upload is already complete")
+
+    result = await db.execute(
+        select(upload_models.UploadChunk)
+        .where(upload_models.UploadChunk.session_id == upload.id)
+        .order_by(upload_models.UploadChunk.index)
+    )
+    chunks = result.scalars().all()
+    missing = _chunk_count(upload) - len(chunks)
+    if missing:
+        raise HTTPException(status_code=409, detail=f"{missing} chunk(s) have not been received")
+
+    # Checksum of the chunk checksums (as S3 does for multipart objects):
+    # verifies the whole file without reading it back.
+    checksum = hashlib.sha256(b"".join(bytes.fromhex(chunk.sha256) for chunk in chunks)).hexdigest()
+    if video_in.checksum.lower() != checksum:
+        raise HTTPException(status_code=400, detail="Checksum mismatch")
+
+    # Local uploads are hashed and published under their content key, like
+    # create_video. S3 would have to read the object back to hash it, so
+    # there the file keeps its upload key and the blob is recorded without
+    # a hash: identical resumable uploads are not deduplicated on S3.
+    sha256 = await storage_service.chunked_upload_sha256(upload.storage_key, upload.backend_upload_id)
+    blob_key = content_key("videos", sha256, upload.filename) if sha256 else upload.storage_key
+    # Blob row first: its lock keeps scripts/gc_blobs.py off an identical
+    # file already stored under the key until this commits
+    await db.execute(
+        upsert_blob(StoredFile(url="", key=blob_key, size=upload.size, sha256=sha256), upload.content_type)
+    )
+    stored = await storage_service.complete_chunked_upload(
+        upload.storage_key,
+        upload.backend_upload_id,
+        [UploadedChunk(index=chunk.index, size=chunk.size, sha256=chunk.sha256, etag=chunk.etag) for chunk in chunks],
+        blob_key,
+    )
+    upload.status = upload_models.UploadStatus.COMPLETED
+    await db.execute(delete(upload_models.UploadChunk).where(upload_models.UploadChunk.session_id == upload.id))
+    video = models.Video(
+        id=uuid4(),
+        title=video_in.title,
+        description=video_in.description,
+        position=video_in.position,
+        duration_seconds=video_in.duration_seconds,
+        is_published=video_in.is_published,
+        storage_key=stored.key,
+        content_type=upload.content_type,
+        size_bytes=stored.size,
+    )
+    db.add(video)
+    db.add(FileRef(blob_key=stored.key, owner_type=FileOwner.VIDEO.value, owner_id=video.id))
+    await db.commit()
+    video_catalog.invalidate()
+    await db.refresh(video)
+    return video
+
+@router.delete("/uploads/{upload_id}")
+async def cancel_upload(
+    upload_id: UUID,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: user_models.User = Depends(deps.get_current_admin),
+    storage_service: StorageService = Depends(get_storage_service),
+) -> Any:
+    upload = await _get_upload(db, upload_id, lock=True)
+    if upload.status != upload_models.UploadStatus.PENDING:
+        raise HTTPException(status_code=409, detail="Upload is already complete")
+    await storage_service.abort_chunked_upload(upload.storage_key, upload.backend_upload_id)
+    await db.delete(upload)
+    await db.commit()
+    return {"message": "Upload cancelled."}
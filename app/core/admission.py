@@ -0,0 +1,235 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from fastapi import HTTPException, Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.responses import ORJSONResponse
+
+logger = get_logger(__name__)
+
+# Atomic token bucket: refill by elapsed time, take one token if available,
+# otherwise return how long until one is. Uses the Redis clock so every
+# worker sees the same time.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RateLimitStore(ABC):
+    @abstractmethod
+    async def take(self, key: str, rate: float, capacity: int) -> float:
+        """Take one token from ``key``'s bucket; 0 if allowed, else seconds until a token is available"""
+        pass
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process buckets. Least recently used keys are dropped beyond
+    ``maxsize``; a dropped bucket simply starts full again."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, capacity: int) -> float:
+        # No awaits in here, so the event loop serializes updates
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(capacity), now))
+        tokens = min(float(capacity), tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker. Requires the ``redis`` package.
+    Fails open: if Redis is unreachable requests are allowed and logged."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, capacity: int) -> float:
+        try:
+            return float(await self._script(keys=[f"ratelimit:{key}"], args=[rate, capacity]))
+        except Exception as e:
+            logger.warning("Rate limit store unavailable", error=str(e))
+            return 0.0
+
+
+class AdmissionController:
+    """Per-route concurrency limits and token-bucket rate limits.
+
+    Concurrency is limited per process because the work being protected
+    (bcrypt, upload handling) is local CPU and IO; rate limits live in the
+    configured store and can be shared across workers.
+    """
+
+    def __init__(self, store: RateLimitStore):
+        self.store = store
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.active: Dict[str, int] = {}
+        self.shed: Dict[str, Dict[str, int]] = {}
+
+    def _semaphore(self, route: str) -> Optional[asyncio.Semaphore]:
+        limit = settings.admission_max_concurrency.get(route)
+        if not limit:
+            return None
+        if route not in self._semaphores:
+            self._semaphores[route] = asyncio.Semaphore(limit)
+        return self._semaphores[route]
+
+    def _record_shed(self, route: str, reason: str) -> None:
+        counts = self.shed.setdefault(route, {"rate_limited": 0, "overloaded": 0})
+        counts[reason] += 1
+        if settings.metrics_enabled:
+            from app.core.metrics import SHED
+
+            SHED.labels(route, reason).inc()
+
+    async def check_rate(self, route: str, kind: str, value: str) -> Optional[float]:
+        """Seconds to wait if ``value`` (a client IP, an email, ...) is over the
+        ``<route>:<kind>`` limit, else None."""
+        per_minute = settings.rate_limits_per_minute.get(f"{route}:{kind}")
+        if not per_minute:
+            return None
+        wait = await self.store.take(f"{route}:{kind}:{value}", per_minute / 60.0, per_minute)
+        if wait <= 0:
+            return None
+        self._record_shed(route, "rate_limited")
+        return wait
+
+    async def acquire(self, route: str) -> bool:
+        semaphore = self._semaphore(route)
+        if semaphore is None:
+            return True
+        try:
+            # Wait briefly for a slot: absorbs small bursts without queueing
+            # requests behind work that is already saturating the worker.
+            await asyncio.wait_for(semaphore.acquire(), settings.admission_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._record_shed(route, "overloaded")
+            return False
+        self.active[route] = self.active.get(route, 0) + 1
+        return True
+
+    def release(self, route: str) -> None:
+        semaphore = self._semaphores.get(route)
+        if semaphore is not None:
+            self.active[route] -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            route: {
+                "limit": settings.admission_max_concurrency.get(route),
+                "active": self.active.get(route, 0),
+                "shed": self.shed.get(route, {"rate_limited": 0, "overloaded": 0}),
+            }
+            for route in {*settings.admission_max_concurrency, *self.shed}
+        }
+
+
+def _build_store() -> RateLimitStore:
+    if settings.rate_limit_redis_url:
+        return RedisRateLimitStore(settings.rate_limit_redis_url)
+    return MemoryRateLimitStore()
+
+
+admission = AdmissionController(_build_store())
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware applying per-IP rate limits and concurrency limits
+    to the routes in ``routes`` (path -> route name). Runs before the request
+    body is read, so shed requests cost neither an upload nor a bcrypt hash."""
+
+    def __init__(self, app: ASGIApp, routes: Dict[str, str]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = self.routes.get(scope["path"]) if scope["type"] == "http" else None
+        if route is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        wait = await admission.check_rate(route, "ip", client_ip(scope))
+        if wait is not None:
+            response = ORJSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, please try again later."},
+                headers={"Retry-After": _retry_after(wait)},
+            )
+            await response(scope, receive, send)
+            return
+
+        if not await admission.acquire(route):
+            response = ORJSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please try again shortly."},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(route)
+
+
+def rate_limit_form_field(route: str, field: str):
+    """Dependency limiting ``route`` per value of a form field (e.g. the email
+    being logged in to), which per-IP limits miss for distributed attempts."""
+
+    async def dependency(request: Request) -> None:
+        form = await request.form()
+        value = form.get(field)
+        if not isinstance(value, str) or not value:
+            return
+        wait = await admission.check_rate(route, field, value.strip().lower())
+        if wait is not None:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts, please try again later.",
+                headers={"Retry-After": _retry_after(wait)},
+            )
+
+    return dependency
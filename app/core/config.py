@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import validator, AnyHttpUrl, EmailStr
 
@@ -22,22 +22,81 @@ class Settings(BaseSettings):
         "http://localhost:3001", 
         "http://127.0.0.1:3000"
     ]
-    allowed_methods: List[str] = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+    allowed_methods: List[str] = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
     allowed_headers: List[str] = ["*"]
     allowed_hosts: List[str] = ["*"]
 
+    # Metrics Configuration
+    metrics_enabled: bool = True
+    metrics_path: str = "/metrics"
+    # Required when workers > 1 so every worker's samples are merged on scrape;
+    # emptied by scripts/prepare_metrics_dir.py before the workers are launched
+    metrics_multiproc_dir: Optional[str] = None
+
+    # Admission Control for the bcrypt-heavy auth and registration routes
+    admission_control_enabled: bool = True
+    # Concurrent requests per route and worker; excess waits briefly, then gets 503
+    admission_max_concurrency: Dict[str, int] = {"login": 8, "change_password": 4, "register": 4}
+    admission_queue_timeout_seconds: float = 0.1
+    # Token buckets, "<route>:<key>" -> requests per minute (also the burst size); 429 when empty
+    rate_limits_per_minute: Dict[str, int] = {
+        "login:ip": 30,
+        "login:username": 10,
+        "change_password:ip": 10,
+        "register:ip": 10,
+        "register:email": 3,
+    }
+    # Share rate limit buckets across workers (requires the redis package)
+    rate_limit_redis_url: Optional[str] = None
+
     #logging Configuration
     log_level: str = "INFO"
     log_format: str = "json"
+    log_queue_enabled: bool = True  # write logs from a background thread
+    log_queue_size: int = 10000
+    log_queue_block_on_full: bool = False  # False drops (and counts) records when full
 
     # Database Configuration
     database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100  # asyncpg prepared statements per connection
+
+    # SQL Profiling Configuration
+    sql_profiling_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+    n_plus_one_threshold: int = 10  # same statement this many times in one request
 
     # Security Configuration
     secret_key: str
     algorithm: str = "HS256"
-    access_token_expire_minutes: int = 30
-
+    access_token_expire_minutes: int = 15
+    refresh_token_expire_days: int = 14
+    # How often each worker pulls new access token revocations
+    revocation_sync_interval_seconds: float = 5.0
+    # Rows revoked this long before the previous sync are read again, catching
+    # ids that committed out of order (slow transactions, clock skew)
+    revocation_sync_overlap_seconds: float = 60.0
+    media_signing_key: Optional[str] = None  # defaults to a key derived from secret_key
+    media_url_expire_seconds: int = 4 * 60 * 60
+
+    # Password Hashing Configuration
+    password_hash_executor: str = "thread"  # thread or process
+    password_hash_workers: int = 4
+    password_hash_queue_size: int = 64
+
+    # Principal Cache Configuration
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+
+    # Verification Queue Events, pushed to admin clients as server-sent events
+    verification_events_redis_url: Optional[str] = None  # relay across workers (requires the redis package)
+    verification_events_heartbeat_seconds: float = 15.0
+    verification_events_queue_size: int = 256  # per client; a client further behind is reset
+    verification_events_replay_size: int = 512  # recent events kept for Last-Event-ID reconnects
 
     #Admin Configuration
     admin_email: EmailStr
@@ -55,12 +114,67 @@ class Settings(BaseSettings):
     use_credentials: bool = True
     validate_certs: bool = True
 
+    # Email Outbox Configuration
+    outbox_enabled: bool = True
+    outbox_batch_size: int = 50
+    outbox_poll_interval_seconds: float = 5.0
+    outbox_max_attempts: int = 8
+    outbox_backoff_base_seconds: float = 30.0
+    outbox_backoff_max_seconds: float = 3600.0
+    outbox_smtp_timeout_seconds: float = 30.0
+    # Claimed messages are hidden from other senders this long; a batch stops
+    # starting sends once the rest of its lease is shorter than the SMTP timeout
+    outbox_lease_seconds: float = 300.0
+
     # AWS Configuration
     aws_access_key_id: Optional[str] = None
     aws_secret_access_key: Optional[str] = None
     aws_region: str = "us-east-1"
     s3_bucket_name: Optional[str] = None
     cloudfront_domain: Optional[str] = None
+    s3_endpoint_url: Optional[str] = None  # e.g. a local moto server
+    s3_max_pool_connections: int = 20
+    s3_multipart_threshold_bytes: int = 8 * 1024 * 1024
+    s3_multipart_chunk_size_bytes: int = 8 * 1024 * 1024
+    s3_max_concurrency: int = 4
+    # CloudFront signed URLs for private media; S3 presigned URLs are used otherwise
+    cloudfront_key_pair_id: Optional[str] = None
+    cloudfront_private_key_path: Optional[str] = None
+
+    # Upload Configuration
+    max_upload_size_bytes: int = 10 * 1024 * 1024
+    upload_chunk_size_bytes: int = 1024 * 1024
+    max_video_upload_size_bytes: int = 4 * 1024 * 1024 * 1024
+    # Video catalog and entitlement caches. The TTLs bound how long a
+    # worker can miss a change made through another worker.
+    catalog_cache_ttl_seconds: int = 60
+    entitlement_refresh_seconds: int = 300
+    # Unreferenced blobs younger than this are kept by scripts/gc_blobs.py,
+    # covering uploads whose reference is not committed yet
+    blob_gc_grace_hours: int = 24
+    # Worker processes producing payment proof thumbnails and review copies
+    image_workers: int = 2
+    # Sources remembered as rendered / not an image (LRU), and how long a
+    # missing or failing source is answered without asking storage again
+    image_state_cache_size: int = 10000
+    image_failure_ttl_seconds: int = 60
+    # Resumable (chunked) uploads. Chunks double as S3 multipart parts, so
+    # the chunk size must stay at or above S3's 5 MiB part minimum.
+    resumable_chunk_size_bytes: int = 8 * 1024 * 1024
+    resumable_staging_dir: str = "upload_staging"
+    resumable_upload_expire_hours: int = 24
+
+    # Static/Upload Serving Configuration
+    # Cache-Control per top-level uploads directory; "" is the fallback.
+    # Uploaded files never change once written, so they can be cached long.
+    static_cache_control: Dict[str, str] = {
+        "payment_proofs": "private, max-age=86400, immutable",
+        "": "public, max-age=86400",
+    }
+    # Top-level uploads directories only reachable through signed URLs
+    static_private_directories: List[str] = ["videos", "payment_proofs"]
+    static_offload: str = ""  # "", "x-accel-redirect" or "x-sendfile"
+    static_offload_prefix: str = "/protected-uploads"  # internal nginx location for X-Accel-Redirect
 
     @validator("allowed_origins", pre=True)
     def assemble_cors_origins(cls, v: str | List[str]) -> List[str]:
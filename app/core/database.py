@@ -1,13 +1,73 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import time
+from typing import Any, Dict
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=settings.debug,
-)
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - started
+            self.acquisitions += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "acquisitions": self.acquisitions,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": (self.total_wait / self.acquisitions * 1000) if self.acquisitions else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def build_engine(**overrides: Any) -> AsyncEngine:
+    options: Dict[str, Any] = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    options.update(overrides)
+    connect_args = {}
+    if "asyncpg" in SQLALCHEMY_DATABASE_URL:
+        # Set to 0 when running behind pgbouncer in transaction mode
+        connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+    return create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        echo=settings.debug,
+        poolclass=InstrumentedPool,
+        connect_args=connect_args,
+        **options,
+    )
+
+engine = build_engine()
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -18,6 +78,9 @@ AsyncSessionLocal = async_sessionmaker(
 
 Base = declarative_base()
 
+def pool_stats() -> Dict[str, Any]:
+    return engine.pool.stats()
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
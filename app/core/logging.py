@@ -1,22 +1,68 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import sys
+import orjson
 import structlog
-from typing import Any, Dict
+from typing import Any, Dict, IO, Optional
 from app.core.config import settings
 
 
-def configure_logging() -> None:
+def _orjson_dumps(obj: Any, default: Any = None, **kwargs: Any) -> str:
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them.
+
+    When the queue is full the record is either dropped and counted, or the
+    caller waits for space, depending on ``block_on_full``.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block_on_full: bool = False):
+        super().__init__(log_queue)
+        self.block_on_full = block_on_full
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, so the record does not need to
+        # be made picklable; rendering happens on the writer thread.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block_on_full:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(stream: Optional[IO[str]] = None) -> None:
+    global _queue_handler, _listener
+    shutdown_logging()
+
+    shared_processors = [
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso"),
+    ]
     structlog.configure(
         processors=[
             structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
+            *shared_processors,
             structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if settings.log_format == "json" 
-            else structlog.dev.ConsoleRenderer(colors=True),
+            # Rendering is left to the handler's formatter
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
@@ -24,11 +70,55 @@ def configure_logging() -> None:
         cache_logger_on_first_use=True,
     )
 
-    logging.basicConfig(
-        level=getattr(logging, settings.log_level.upper()),
-        format="%(message)s",
+    renderer = (
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps) if settings.log_format == "json"
+        else structlog.dev.ConsoleRenderer(colors=True)
     )
+    stream_handler = logging.StreamHandler(stream or sys.stderr)
+    stream_handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, renderer],
+        # Records from plain stdlib loggers (uvicorn, sqlalchemy, ...)
+        foreign_pre_chain=shared_processors,
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(getattr(logging, settings.log_level.upper()))
+
+    if settings.log_queue_enabled:
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+        _queue_handler = NonBlockingQueueHandler(log_queue, block_on_full=settings.log_queue_block_on_full)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(_queue_handler)
+    else:
+        root.addHandler(stream_handler)
+
+
+def shutdown_logging() -> None:
+    """Stop the writer thread after it has written everything still queued."""
+    global _queue_handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
+
+
+def log_stats() -> Dict[str, Any]:
+    if _queue_handler is None:
+        return {"queued": False}
+    return {
+        "queued": True,
+        "queue_depth": _queue_handler.queue.qsize(),
+        "queue_size": settings.log_queue_size,
+        "dropped": _queue_handler.dropped,
+    }
 
 def get_logger(name: str) -> structlog.stdlib.BoundLogger:
     return structlog.get_logger(name)
-
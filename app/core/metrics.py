@@ -0,0 +1,128 @@
+import os
+import time
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+# prometheus_client picks its storage backend at import time. With several
+# uvicorn workers each process writes its samples to files in this directory
+# and the scrape endpoint merges them, so counts are correct whichever worker
+# answers the scrape. The directory must be emptied before the workers start
+# (scripts/prepare_metrics_dir.py, or a gunicorn on_starting hook calling
+# prepare_multiprocess_dir), otherwise the previous run's samples are added in.
+if settings.metrics_multiproc_dir:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.metrics_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status class.",
+    ["method", "route", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving the request to sending the last response byte.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected by admission control, by route and reason.",
+    ["route", "reason"],
+)
+
+
+def _multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def prepare_multiprocess_dir() -> None:
+    """Clear samples left by a previous run. Call once in the parent process
+    before workers start: ``python -m app.main`` does, ``uvicorn --workers``
+    and gunicorn need scripts/prepare_metrics_dir.py or an on_starting hook."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def mark_worker_dead() -> None:
+    if _multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def render_metrics() -> bytes:
+    if _multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template, e.g. ``/api/v1/admin/verify/{user_id}``.
+
+    Raw paths are never used as labels so the number of series stays bounded.
+    """
+    route = scope.get("route")
+    if route is None:
+        if scope.get("endpoint") is not None and scope.get("root_path"):
+            # Mounted sub-application such as the static files
+            return f"{scope['root_path']}/{{path}}"
+        return UNMATCHED_ROUTE
+    if isinstance(route, Mount):
+        return f"{route.path}/{{path}}"
+
+    template = getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE)
+    # Routes of included routers may carry only the template relative to
+    # their prefix; recover the prefix from the concrete path.
+    path = scope.get("path", "")
+    concrete = template
+    for name, value in scope.get("path_params", {}).items():
+        concrete = concrete.replace(f"{{{name}}}", str(value))
+    if concrete != path and path.endswith(concrete):
+        return path[: len(path) - len(concrete)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts and latency per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == settings.metrics_path:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            method = scope["method"]
+            REQUESTS.labels(method, route, f"{status_code // 100}xx").inc()
+            LATENCY.labels(method, route).observe(time.perf_counter() - started)
@@ -1,10 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.core.config import settings
 
 
 def configure_middleware(app: FastAPI) -> None:
+    # The last middleware added is the outermost. Requests pass through CORS,
+    # metrics, host checks and admission control, in that order, so even shed
+    # responses carry CORS headers and bad hosts never consume rate limit tokens.
+    if settings.sql_profiling_enabled:
+        configure_sql_profiling(app)
+    if settings.admission_control_enabled:
+        configure_admission_control(app)
+    app.add_middleware(
+        TrustedHostMiddleware,
+        allowed_hosts=settings.allowed_hosts,
+    )
+    if settings.metrics_enabled:
+        configure_metrics(app)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_origins,
@@ -12,11 +25,40 @@ def configure_middleware(app: FastAPI) -> None:
         allow_methods=settings.allowed_methods,
         allow_headers=settings.allowed_headers,
     )
+
+
+def configure_sql_profiling(app: FastAPI) -> None:
+    from app.core.database import engine
+    from app.core.sql_profiler import QueryProfilerMiddleware, install_sql_profiler
+
+    install_sql_profiler(engine)
+    app.add_middleware(QueryProfilerMiddleware)
+
+
+def configure_admission_control(app: FastAPI) -> None:
+    from app.core.admission import AdmissionControlMiddleware
+
+    prefix = settings.api_v1_prefix
     app.add_middleware(
-        TrustedHostMiddleware,
-        allowed_hosts=settings.allowed_hosts,
+        AdmissionControlMiddleware,
+        routes={
+            f"{prefix}/auth/login": "login",
+            f"{prefix}/auth/change-password": "change_password",
+            f"{prefix}/registration/register": "register",
+        },
     )
 
 
+def configure_metrics(app: FastAPI) -> None:
+    from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+
+    # Outside everything but CORS, so it times shed and rejected requests too
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get(settings.metrics_path, include_in_schema=False)
+    async def metrics() -> Response:
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 
 
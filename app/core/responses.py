@@ -0,0 +1,82 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: orjson handles UUIDs, datetimes and enums natively."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def _nested(annotation: Any) -> Optional[Tuple[str, type]]:
+    """("one", Model) or ("many", Model) if the annotation holds pydantic models."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return ("one", annotation)
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin in (list, List) and args:
+        inner = _nested(args[0])
+        return ("many", inner[1]) if inner and inner[0] == "one" else None
+    if origin is Union:
+        for arg in args:
+            if arg is not type(None):
+                return _nested(arg)
+    return None
+
+
+@lru_cache(maxsize=None)
+def _plan(model: type) -> Tuple[Tuple[str, Any, Optional[Tuple[str, type]]], ...]:
+    return tuple(
+        (name, field.get_default(call_default_factory=True), _nested(field.annotation))
+        for name, field in model.model_fields.items()
+    )
+
+
+def _dump_trusted(model: type, obj: Any) -> Dict[str, Any]:
+    is_mapping = isinstance(obj, dict)
+    data = {}
+    for name, default, nested in _plan(model):
+        value = obj.get(name, default) if is_mapping else getattr(obj, name, default)
+        if nested is not None and value is not None:
+            kind, inner = nested
+            value = _dump_trusted(inner, value) if kind == "one" else [_dump_trusted(inner, v) for v in value]
+        data[name] = value
+    return data
+
+
+def dump_json(schema: Any, content: Any, trusted: bool = False) -> bytes:
+    """JSON bytes of ORM objects (or dicts of them) serialized as ``schema``.
+
+    With ``trusted=True`` values are read straight from the objects without
+    validation (no re-checking of emails, UUIDs, ...); only use it for data
+    loaded from our own database.
+    """
+    if trusted:
+        nested = _nested(schema)
+        if nested is None:
+            raise TypeError(f"Cannot serialize {schema!r} without validation")
+        kind, model = nested
+        data = _dump_trusted(model, content) if kind == "one" else [_dump_trusted(model, v) for v in content]
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    adapter = _adapter(schema)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def model_response(schema: Any, content: Any, status_code: int = 200, trusted: bool = False) -> Response:
+    """Serialize ``content`` as ``schema`` in one pass (see dump_json).
+
+    Returning a Response means FastAPI does not validate and encode the same
+    objects again for the route's response_model, which stays in place for the
+    OpenAPI schema.
+    """
+    body = dump_json(schema, content, trusted=trusted)
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -1,5 +1,13 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any
+from typing import Optional, Union, Any, Callable, Dict, List, Tuple
+from urllib.parse import quote
+from uuid import uuid4
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -18,16 +26,166 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+
+class PasswordHashPoolFull(Exception):
+    """Raised when the password hashing queue is at capacity."""
+
+
+class PasswordHashPool:
+    """Runs bcrypt work off the event loop with a bounded wait queue.
+
+    At most ``max_workers`` hashes run at once; up to ``max_queue`` more callers
+    may wait for a slot, anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, executor: str = "thread"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pwd-hash"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        if self.in_flight >= self.max_workers and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHashPoolFull()
+
+        self.queued += 1
+        enqueued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        wait = time.perf_counter() - enqueued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor_kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (self.total_wait / self.completed * 1000) if self.completed else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_queue_size,
+    executor=settings.password_hash_executor,
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
+_unusable_password_hash: Optional[str] = None
+
+async def get_unusable_password_hash() -> str:
+    """Placeholder hash for accounts that cannot log in yet. The secret is
+    random and discarded, and it is hashed only once per process."""
+    global _unusable_password_hash
+    if _unusable_password_hash is None:
+        _unusable_password_hash = await get_password_hash_async(secrets.token_urlsafe(32))
+    return _unusable_password_hash
+
+async def get_password_hashes_async(passwords: List[str], concurrency: Optional[int] = None) -> List[str]:
+    # Submit at most ``concurrency`` (default: every worker slot) at a time so
+    # a large batch waits its turn instead of overflowing the shared queue.
+    hashes: List[str] = []
+    step = concurrency or password_hash_pool.max_workers
+    for i in range(0, len(passwords), step):
+        hashes.extend(
+            await asyncio.gather(*(get_password_hash_async(p) for p in passwords[i:i + step]))
+        )
+    return hashes
+
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # jti and iat let a single token, or all of a subject's tokens issued
+    # before a point in time, be revoked (see app.services.revocation). iat
+    # keeps sub-second precision so a token issued right after such a cutoff,
+    # within the same second, is not revoked with the older ones.
+    to_encode = {"exp": expire, "iat": time.time(), "sub": str(subject), "jti": uuid4().hex, "type": "access"}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token() -> Tuple[str, str]:
+    """Opaque refresh token and the hash stored for it; the token itself is never stored."""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def generate_temp_password(length: int = 12) -> str:
     alphabet = string.ascii_letters + string.digits
     return ''.join(secrets.choice(alphabet) for i in range(length))
+
+# Media URLs are signed with a key derived from SECRET_KEY unless one is
+# configured, so a leaked media signature cannot be used to forge JWTs.
+MEDIA_SIGNING_KEY = (
+    settings.media_signing_key.encode() if settings.media_signing_key
+    else hmac.new(SECRET_KEY.encode(), b"media-url-signing", hashlib.sha256).digest()
+)
+
+def sign_media_path(key: str, expires: int) -> str:
+    digest = hmac.new(MEDIA_SIGNING_KEY, f"{key}:{expires}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+def verify_media_signature(key: str, expires: int, signature: str) -> bool:
+    """Pure in-memory check: no database or user lookup per request."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(sign_media_path(key, expires), signature)
+
+def media_preview_url(key: str, variant: str) -> str:
+    """Signed URL of a derived image of ``key``. The expiry is rounded up to
+    the hour so the URL, and the browser's cached copy, stay the same for a while."""
+    expires = (int(time.time()) // 3600 + 1) * 3600 + settings.media_url_expire_seconds
+    signature = sign_media_path(f"{variant}/{key}", expires)
+    return f"{settings.api_v1_prefix}/media/{variant}/{quote(key)}?expires={expires}&signature={signature}"
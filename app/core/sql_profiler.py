@@ -0,0 +1,104 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app.sql")
+slow_query_logger = get_logger("app.sql.slow")
+
+
+class RequestQueryStats:
+    __slots__ = ("path", "count", "total_seconds", "shapes")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_request_stats", default=None)
+
+
+def _shorten(statement: str, limit: int = 500) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Kept on the execution context rather than the connection, so a
+    # statement that raises leaves nothing behind
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    path = stats.path if stats is not None else None
+
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        slow_query_logger.warning(
+            "Slow query",
+            duration_ms=round(elapsed * 1000, 2),
+            statement=_shorten(statement),
+            path=path,
+        )
+
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_seconds += elapsed
+    # Statements are already parameterized, so the text is the query's shape
+    stats.shapes[statement] += 1
+    if stats.shapes[statement] == settings.n_plus_one_threshold:
+        logger.warning(
+            "Possible N+1 query",
+            repeats=settings.n_plus_one_threshold,
+            statement=_shorten(statement),
+            path=path,
+        )
+
+
+def install_sql_profiler(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryProfilerMiddleware:
+    """Ties SQL statements to the request that issued them and reports the
+    totals in a ``Server-Timing`` header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope["path"])
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.total_seconds * 1000:.2f};desc="{stats.count} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,163 @@
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional, Tuple
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.types import Scope
+from app.core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    # Uploads are written once under unique names, so size + mtime
+    # identifies the content without hashing it on every request.
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def validator_headers(stat_result: os.stat_result) -> Dict[str, str]:
+    return {
+        "etag": strong_etag(stat_result),
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+    }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags
+
+
+def is_not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single ``bytes=`` range.
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges, which are answered with the full body) and raises ValueError
+    when the range cannot be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    if not (start_s or end_s) or not all(part.isdigit() for part in (start_s, end_s) if part):
+        return None
+    if start_s == "":
+        # Suffix range: the last N bytes
+        length = int(end_s)
+        if length == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(size - length, 0), size - 1
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+async def _iter_file_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    remaining = end - start + 1
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    path: str,
+    stat_result: os.stat_result,
+    request_headers: Headers,
+    extra_headers: Optional[Dict[str, str]] = None,
+    media_type: Optional[str] = None,
+    offload_path: Optional[str] = None,
+) -> Response:
+    """Serve a file with conditional GET, single byte ranges and optional
+    X-Accel-Redirect / X-Sendfile offload to the front proxy."""
+    headers = validator_headers(stat_result)
+    headers.update(extra_headers or {})
+    media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if is_not_modified(request_headers, headers["etag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if settings.static_offload == "x-accel-redirect" and offload_path is not None:
+        headers["x-accel-redirect"] = offload_path
+        return Response(status_code=200, headers=headers, media_type=media_type)
+    if settings.static_offload == "x-sendfile":
+        headers["x-sendfile"] = os.path.abspath(path)
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    size = stat_result.st_size
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == headers["etag"]):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["content-range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            headers["content-length"] = str(end - start + 1)
+            return StreamingResponse(
+                _iter_file_range(path, start, end), status_code=206, headers=headers, media_type=media_type
+            )
+
+    return FileResponse(path, stat_result=stat_result, headers=headers, media_type=media_type)
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles for ``uploads/`` with per-directory Cache-Control, strong
+    validators, Range support and optional proxy offload."""
+
+    def cache_control_for(self, relative_path: str) -> str:
+        directory = relative_path.split("/", 1)[0] if "/" in relative_path else ""
+        policies = settings.static_cache_control
+        return policies.get(directory, policies.get("", "no-cache"))
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        directory = path.replace(os.sep, "/").lstrip("/").split("/", 1)[0]
+        if directory in settings.static_private_directories:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        offload_path = f"{settings.static_offload_prefix.rstrip('/')}/{relative_path}"
+        return file_response(
+            str(full_path),
+            stat_result,
+            Headers(scope=scope),
+            extra_headers={"cache-control": self.cache_control_for(relative_path)},
+            offload_path=offload_path,
+        )
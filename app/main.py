@@ -1,12 +1,19 @@
 import os
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
 from app.core.config import settings
-from app.core.logging import configure_logging, get_logger
+from app.core.logging import configure_logging, get_logger, shutdown_logging
 from app.core.middleware import configure_middleware
 from contextlib import asynccontextmanager
 from app.api.v1.api import api_router
-from app.core.database import Base, engine
+from app.core.database import engine
+from app.core.responses import ORJSONResponse
+from app.core.static_files import UploadStaticFiles
+from app.core.security import PasswordHashPoolFull, password_hash_pool
+from app.services.events import verification_events
+from app.services.images import image_pipeline
+from app.services.outbox import outbox_sender
+from app.services.revocation import revocation_list
+from app.services.templates import email_templates
 
 
 configure_logging()
@@ -17,12 +24,25 @@ logger = get_logger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting AKM SIR BIO API", version=settings.version)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created")
+    # Schema changes are applied separately with `alembic upgrade head`
+    email_templates.load()
+    if settings.outbox_enabled:
+        outbox_sender.start()
+    revocation_list.start()
+    verification_events.start()
     yield
     # Shutdown
     logger.info("Shutting down AKM SIR BIO API")
+    await outbox_sender.stop()
+    await revocation_list.stop()
+    await verification_events.stop()
+    password_hash_pool.shutdown()
+    image_pipeline.shutdown()
+    if settings.metrics_enabled:
+        from app.core.metrics import mark_worker_dead
+        mark_worker_dead()
+    shutdown_logging()
+    await engine.dispose()
 
 
 app = FastAPI(
@@ -32,13 +52,23 @@ app = FastAPI(
     openapi_url=f"{settings.api_v1_prefix}/openapi.json",
     docs_url=f"{settings.api_v1_prefix}/docs",
     redoc_url=f"{settings.api_v1_prefix}/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
 configure_middleware(app)
+
+@app.exception_handler(PasswordHashPoolFull)
+async def password_hash_pool_full_handler(request: Request, exc: PasswordHashPoolFull):
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again shortly."},
+        headers={"Retry-After": "1"},
+    )
+
 app.include_router(api_router, prefix=settings.api_v1_prefix)
 os.makedirs("uploads", exist_ok=True)
-app.mount(f"{settings.api_v1_prefix}/static", StaticFiles(directory="uploads"), name="static")
+app.mount(f"{settings.api_v1_prefix}/static", UploadStaticFiles(directory="uploads"), name="static")
 
 @app.get(f"{settings.api_v1_prefix}/", tags=["root"])
 async def root():
@@ -51,6 +81,9 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
+    if settings.metrics_enabled:
+        from app.core.metrics import prepare_multiprocess_dir
+        prepare_multiprocess_dir()
     uvicorn.run(
        "app.main:app",
         host=settings.host,
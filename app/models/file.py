@@ -0,0 +1,40 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, String
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID
+import enum
+import uuid
+from app.core.database import Base
+
+class FileOwner(str, enum.Enum):
+    PAYMENT_PROOF = "payment_proof"
+    VIDEO = "video"
+
+class FileBlob(Base):
+    """One stored object. Uploads are keyed by content hash, so identical
+    uploads share a blob; it is reclaimed by scripts/gc_blobs.py once no
+    FileRef points at it."""
+    __tablename__ = "file_blobs"
+    __table_args__ = (
+        Index("ix_file_blobs_last_referenced_at", "last_referenced_at"),
+    )
+
+    key = Column(String, primary_key=True)
+    sha256 = Column(String, nullable=True) # NULL for files stored before content addressing
+    size = Column(BigInteger, nullable=True)
+    content_type = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped whenever an upload resolves to this blob; GC spares recent blobs
+    last_referenced_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class FileRef(Base):
+    """A logical upload (a payment proof, a video) pointing at its blob."""
+    __tablename__ = "file_refs"
+    __table_args__ = (
+        Index("ix_file_refs_owner", "owner_type", "owner_id"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    blob_key = Column(String, ForeignKey("file_blobs.key"), nullable=False, index=True)
+    owner_type = Column(String, nullable=False)
+    owner_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,32 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, String
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from app.core.database import Base
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    token_hash = Column(String, unique=True, nullable=False) # SHA-256 of the opaque token
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True) # Shared by every rotation of one login
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+class TokenRevocation(Base):
+    """Revoked access tokens: one ``jti``, or every token of ``subject``
+    issued at or before ``revoked_at``. Rows are only needed until the tokens
+    they cover have expired anyway."""
+    __tablename__ = "token_revocations"
+    __table_args__ = (
+        Index("ix_token_revocations_expires_at", "expires_at"),
+    )
+
+    # Increasing id lets workers fetch only the rows added since their last sync
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    jti = Column(String, nullable=True)
+    subject = Column(String, nullable=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,38 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID
+import enum
+import uuid
+from app.core.database import Base
+
+class UploadStatus(str, enum.Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    __table_args__ = (
+        Index("ix_upload_sessions_status_expires_at", "status", "expires_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    storage_key = Column(String, nullable=False)
+    backend_upload_id = Column(String, nullable=True) # S3 multipart UploadId
+    status = Column(String, default=UploadStatus.PENDING, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+class UploadChunk(Base):
+    __tablename__ = "upload_chunks"
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    index = Column(Integer, primary_key=True)
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String, nullable=False)
+    etag = Column(String, nullable=True) # S3 part ETag
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,10 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 import enum
 import uuid
+from app.core import security
 from app.core.database import Base
 
 class UserRole(str, enum.Enum):
@@ -25,6 +26,7 @@ class User(Base):
     role = Column(String, default=UserRole.STUDENT)
     is_active = Column(Boolean, default=False) # Inactive until approved
     must_change_password = Column(Boolean, default=False)
+    idempotency_key = Column(String, unique=True, nullable=True) # Client key of the registration request
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     student_profile = relationship("StudentProfile", back_populates="user", uselist=False)
@@ -44,11 +46,30 @@ class StudentProfile(Base):
 
 class PaymentProof(Base):
     __tablename__ = "payment_proofs"
+    __table_args__ = (
+        # Serves the admin verification queue: filter on status, keyset on (submitted_at, id)
+        Index("ix_payment_proofs_status_submitted_at", "status", "submitted_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
     file_path = Column(String)
+    storage_key = Column(String, nullable=True) # Key in the storage backend; file_path is its URL
     status = Column(String, default=PaymentStatus.PENDING)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="payment_proof")
+
+    # Signed links to the upload and its derived images, served (and the
+    # derived images regenerated if missing) by the media route
+    @property
+    def original_url(self):
+        return security.media_preview_url(self.storage_key, "original") if self.storage_key else None
+
+    @property
+    def thumbnail_url(self):
+        return security.media_preview_url(self.storage_key, "thumbnail") if self.storage_key else None
+
+    @property
+    def review_url(self):
+        return security.media_preview_url(self.storage_key, "review") if self.storage_key else None
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from app.core.database import Base
+
+class Video(Base):
+    __tablename__ = "videos"
+    __table_args__ = (
+        # Catalog listing: published lessons in course order
+        Index("ix_videos_published_position", "is_published", "position"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    position = Column(Integer, default=0, nullable=False)
+    storage_key = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    duration_seconds = Column(Integer, nullable=True)
+    is_published = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,6 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, EmailStr, Field
 from uuid import UUID
 
 class UserBase(BaseModel):
@@ -20,7 +21,11 @@ class PasswordChange(BaseModel):
 class PaymentProofResponse(BaseModel):
     id: UUID
     file_path: str
+    original_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    review_url: Optional[str] = None
     status: str
+    submitted_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -35,6 +40,26 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class VerificationPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+class BulkVerificationItem(BaseModel):
+    user_id: UUID
+    action: Literal["approve", "reject"]
+    reason: str = ""
+
+class BulkVerificationRequest(BaseModel):
+    items: List[BulkVerificationItem] = Field(..., min_length=1, max_length=500)
+
+class BulkVerificationResult(BaseModel):
+    user_id: UUID
+    status: str  # approved, rejected, skipped or not_found
+    detail: Optional[str] = None
+
+class BulkVerificationResponse(BaseModel):
+    results: List[BulkVerificationResult]
+
 class StudentRegistration(BaseModel):
     first_name: str
     last_name: str
@@ -46,6 +71,10 @@ class StudentRegistration(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
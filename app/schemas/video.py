@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from uuid import UUID
+
+class VideoUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    position: Optional[int] = None
+    duration_seconds: Optional[int] = None
+    is_published: Optional[bool] = None
+
+class VideoResponse(BaseModel):
+    id: UUID
+    title: str
+    description: Optional[str] = None
+    position: int
+    content_type: Optional[str] = None
+    size_bytes: Optional[int] = None
+    duration_seconds: Optional[int] = None
+    is_published: bool
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class VideoStreamUrl(BaseModel):
+    url: str
+    expires_at: datetime
+
+class UploadCreate(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    size: int = Field(..., gt=0)
+
+class UploadStatusResponse(BaseModel):
+    id: UUID
+    filename: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    offset: int # Bytes received contiguously from the start
+    received_chunks: List[int]
+    status: str
+    expires_at: datetime
+
+class UploadComplete(BaseModel):
+    title: str
+    description: Optional[str] = None
+    position: int = 0
+    duration_seconds: Optional[int] = None
+    is_published: bool = True
+    # Hex SHA-256 over the concatenated raw SHA-256 digests of every chunk, in order
+    checksum: str = Field(..., min_length=64, max_length=64)
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.responses import dump_json
+from app.models import user as user_models
+from app.models import video as models
+from app.schemas import video as schemas
+
+class VideoCatalog:
+    """Rendered catalog JSON and its ETag, cached per process.
+
+    Writes call ``invalidate()``, which bumps the version so the next request
+    re-renders. The ETag is derived from the body, so every worker hands out
+    the same tag for the same catalog.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        # include_unpublished -> (version, expires_at, body, etag)
+        self._entries: Dict[bool, Tuple[int, float, bytes, str]] = {}
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    def _current(self, include_unpublished: bool) -> Optional[Tuple[int, float, bytes, str]]:
+        entry = self._entries.get(include_unpublished)
+        if entry and entry[0] == self.version and entry[1] > time.monotonic():
+            return entry
+        return None
+
+    async def get(self, db: AsyncSession, include_unpublished: bool = False) -> Tuple[bytes, str]:
+        entry = self._current(include_unpublished)
+        if entry is None:
+            # One request rebuilds; the others waiting here reuse its result
+            async with self._lock:
+                entry = self._current(include_unpublished)
+                if entry is None:
+                    self.misses += 1
+                    entry = await self._render(db, include_unpublished)
+                    self._entries[include_unpublished] = entry
+                    return entry[2], entry[3]
+        self.hits += 1
+        return entry[2], entry[3]
+
+    async def _render(self, db: AsyncSession, include_unpublished: bool) -> Tuple[int, float, bytes, str]:
+        version = self.version
+        query = select(models.Video).order_by(models.Video.position, models.Video.created_at)
+        if not include_unpublished:
+            query = query.where(models.Video.is_published.is_(True))
+        result = await db.execute(query)
+        body = dump_json(List[schemas.VideoResponse], result.scalars().all(), trusted=True)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        # Keyed to the version seen before the query: a write that lands
+        # meanwhile leaves this entry already stale.
+        return version, time.monotonic() + self.ttl, body, etag
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+class EntitlementSet:
+    """Ids of students with course access: active with an approved payment.
+
+    Loaded with one query and kept current by ``grant``/``revoke`` from the
+    verification endpoints. A full reload every ``refresh_seconds`` picks up
+    revocations made by other workers; grants made elsewhere are found by the
+    fallback query on a miss.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._ids: Set[UUID] = set()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    async def _reload(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(user_models.PaymentProof.user_id)
+            .join(user_models.User, user_models.User.id == user_models.PaymentProof.user_id)
+            .where(
+                user_models.User.is_active.is_(True),
+                user_models.PaymentProof.status == user_models.PaymentStatus.APPROVED,
+            )
+        )
+        self._ids = set(result.scalars().all())
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def contains(self, db: AsyncSession, user_id: UUID) -> bool:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    await self._reload(db)
+        if user_id in self._ids:
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        result = await db.execute(
+            select(user_models.PaymentProof.id).where(
+                user_models.PaymentProof.user_id == user_id,
+                user_models.PaymentProof.status == user_models.PaymentStatus.APPROVED,
+            ).limit(1)
+        )
+        if result.first() is None:
+            return False
+        self._ids.add(user_id)
+        return True
+
+    def grant(self, user_id: UUID) -> None:
+        self._ids.add(user_id)
+
+    def revoke(self, user_id: UUID) -> None:
+        self._ids.discard(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._ids),
+            "refresh_seconds": self.refresh_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+video_catalog = VideoCatalog(ttl=settings.catalog_cache_ttl_seconds)
+entitlements = EntitlementSet(refresh_seconds=settings.entitlement_refresh_seconds)
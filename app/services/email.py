@@ -1,22 +1,35 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from functools import lru_cache
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.models.outbox import EmailOutbox
+from app.services.templates import RenderedEmail, email_templates
 from pydantic import EmailStr
 from typing import List
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME=settings.mail_from_name,
-    MAIL_STARTTLS=settings.mail_starttls,
-    MAIL_SSL_TLS=settings.mail_ssl_tls,
-    USE_CREDENTIALS=settings.use_credentials,
-    VALIDATE_CERTS=settings.validate_certs
-)
+@lru_cache
+def get_mail_config():
+    # fastapi_mail is only needed for the diagnostic send path, so it is
+    # imported on first use instead of at application import.
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME=settings.mail_from_name,
+        MAIL_STARTTLS=settings.mail_starttls,
+        MAIL_SSL_TLS=settings.mail_ssl_tls,
+        USE_CREDENTIALS=settings.use_credentials,
+        VALIDATE_CERTS=settings.validate_certs
+    )
 
 async def send_email(subject: str, recipients: List[EmailStr], body: str):
+    """Send immediately over a fresh connection. Only used for diagnostics;
+    application mail goes through the outbox."""
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+
     message = MessageSchema(
         subject=subject,
         recipients=recipients,
@@ -24,43 +37,37 @@ async def send_email(subject: str, recipients: List[EmailStr], body: str):
         subtype=MessageType.html
     )
     
-    fm = FastMail(conf)
+    fm = FastMail(get_mail_config())
     await fm.send_message(message)
 
-async def send_welcome_email(email: EmailStr, password: str):
-    body = f"""
-    <h1>Welcome to AKM SIR BIOLOGY</h1>
-    <p>Your account has been approved.</p>
-    <p><b>Username:</b> {email}</p>
-    <p><b>Temporary Password:</b> {password}</p>
-    <p>Please login and change your password immediately.</p>
-    """
-    try:
-        await send_email("Account Approved - Credentials", [email], body)
-    except Exception as e:
-        print(f"FAILED TO SEND EMAIL: {e}")
+def queue_email(db: AsyncSession, recipients: List[EmailStr], email: RenderedEmail):
+    """Add messages to the outbox. They are sent once the caller's transaction
+    commits; call outbox_sender.notify() afterwards to wake the sender."""
+    for recipient in recipients:
+        db.add(EmailOutbox(
+            recipient=recipient, subject=email.subject, body=email.html, text_body=email.text
+        ))
+
+def render_welcome_email(email: EmailStr, password: str) -> RenderedEmail:
+    return email_templates.render(
+        "welcome", "Account Approved - Credentials", email=email, password=password
+    )
+
+def render_registration_received_email(name: str) -> RenderedEmail:
+    return email_templates.render(
+        "registration_received", "Registration Received - AKM SIR BIOLOGY", name=name
+    )
+
+def render_rejection_email(reason: str = "") -> RenderedEmail:
+    return email_templates.render(
+        "rejection", "Registration Update - Action Required", reason=reason
+    )
+
+def queue_welcome_email(db: AsyncSession, email: EmailStr, password: str):
+    queue_email(db, [email], render_welcome_email(email, password))
 
-async def send_registration_received_email(email: EmailStr, name: str):
-    body = f"""
-    <h1>Registration Received</h1>
-    <p>Dear {name},</p>
-    <p>Thank you for registering with AKM SIR BIOLOGY.</p>
-    <p>We have received your registration and payment proof. An admin will verify your details shortly.</p>
-    <p>You will receive another email with your login credentials once approved.</p>
-    """
-    try:
-        await send_email("Registration Received - AKM SIR BIOLOGY", [email], body)
-    except Exception as e:
-        print(f"FAILED TO SEND EMAIL: {e}")
+def queue_registration_received_email(db: AsyncSession, email: EmailStr, name: str):
+    queue_email(db, [email], render_registration_received_email(name))
 
-async def send_rejection_email(email: EmailStr, reason: str = ""):
-    body = f"""
-    <h1>Registration Update</h1>
-    <p>Your registration for AKM SIR BIOLOGY was not approved.</p>
-    <p><b>Reason:</b> {reason or 'Verification failed'}</p>
-    <p>Please contact support or try registering again with correct details.</p>
-    """
-    try:
-        await send_email("Registration Update - Action Required", [email], body)
-    except Exception as e:
-        print(f"FAILED TO SEND EMAIL: {e}")
+def queue_rejection_email(db: AsyncSession, email: EmailStr, reason: str = ""):
+    queue_email(db, [email], render_rejection_email(reason))
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set, Tuple
+from uuid import uuid4
+
+import orjson
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+REDIS_CHANNEL = "verification-events"
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class Subscriber:
+    def __init__(self, size: int):
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=size)
+        self.lagged = False
+
+
+class VerificationBroadcaster:
+    """Fans verification queue changes out to open admin event streams.
+
+    Each event is encoded to an SSE frame once and the same bytes are put on
+    every subscriber's queue, so an idle admin tab costs a parked coroutine
+    and nothing in the database. A subscriber that falls behind is reset
+    instead of buffering without bound.
+
+    Events published by this worker are delivered directly; with
+    ``verification_events_redis_url`` set they are also relayed over Redis
+    pub/sub to the other workers. Without it each worker only sees its own
+    events, which is exact for a single worker.
+
+    Frame ids are ``<worker>-<seq>``; a reconnect carrying Last-Event-ID is
+    replayed from the recent frames when it was served by this worker and
+    the frames are still kept, and reset otherwise.
+    """
+
+    def __init__(self, queue_size: int, replay_size: int, redis_url: Optional[str] = None):
+        self.queue_size = queue_size
+        self.redis_url = redis_url
+        self.origin = uuid4().hex[:12]
+        self._seq = 0
+        self._recent: Deque[Tuple[int, bytes]] = deque(maxlen=replay_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._redis: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.relayed = 0
+        self.resets = 0
+        self.relay_failures = 0
+
+    def _marker(self, event: str) -> bytes:
+        # Carries the current id without taking a sequence number: ``ready``,
+        # and ``reset``, which tells the client its view may have gaps and
+        # it should reload the queue
+        return b"id: %s-%d\nevent: %s\ndata: {}\n\n" % (self.origin.encode(), self._seq, event.encode())
+
+    def _frame(self, event: str, data: bytes) -> bytes:
+        self._seq += 1
+        frame = b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (
+            self.origin.encode(), self._seq, event.encode(), data,
+        )
+        self._recent.append((self._seq, frame))
+        return frame
+
+    def _deliver(self, frame: bytes) -> None:
+        reset = None
+        for subscriber in self._subscribers:
+            if subscriber.lagged:
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                reset = reset or self._marker("reset")
+                self._reset(subscriber, reset)
+
+    def _deliver_reset(self) -> None:
+        reset = self._marker("reset")
+        for subscriber in self._subscribers:
+            if not subscriber.lagged:
+                self._reset(subscriber, reset)
+
+    @staticmethod
+    def _reset(subscriber: Subscriber, reset: bytes) -> None:
+        # Drop the backlog and queue only the reset; nothing more is queued
+        # for the subscriber until its stream has sent it
+        subscriber.lagged = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(reset)
+
+    async def publish(self, event: str, payload: Dict[str, Any]) -> None:
+        """Deliver ``event`` to every open stream. Call after the change is committed."""
+        data = orjson.dumps(payload)
+        self._deliver(self._frame(event, data))
+        self.published += 1
+        if self._redis is not None:
+            message = orjson.dumps({"origin": self.origin, "event": event}) + b"\n" + data
+            try:
+                await self._redis.publish(REDIS_CHANNEL, message)
+            except Exception as e:
+                self.relay_failures += 1
+                logger.warning("Verification event relay failed", error=str(e))
+
+    def _replay(self, last_event_id: Optional[str]) -> Optional[list]:
+        """Frames after ``last_event_id``, or None if they cannot be replayed."""
+        if not last_event_id:
+            return []
+        origin, _, seq = last_event_id.rpartition("-")
+        if origin != self.origin or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq == self._seq:
+            return []
+        if seq > self._seq or not self._recent or self._recent[0][0] > seq + 1:
+            return None
+        return [frame for frame_seq, frame in self._recent if frame_seq > seq]
+
+    async def stream(self, last_event_id: Optional[str] = None, max_seconds: Optional[float] = None) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client. The first frame is ``ready`` (or a
+        replay / reset for reconnects); clients load the queue after it so
+        nothing published in between is missed. Ends after ``max_seconds``."""
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        subscriber = Subscriber(self.queue_size)
+        # Subscribed and replayed without yielding in between: later frames
+        # arrive on the queue, earlier ones are in the replay, none in both
+        self._subscribers.add(subscriber)
+        replay = self._replay(last_event_id)
+        if replay is None:
+            self.resets += 1
+            replay = [self._marker("reset")]
+        elif not last_event_id:
+            replay = [self._marker("ready")]
+        try:
+            yield b"retry: 3000\n\n" + b"".join(replay)
+            while True:
+                timeout = settings.verification_events_heartbeat_seconds
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.monotonic())
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), timeout=max(timeout, 0))
+                except asyncio.TimeoutError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return
+                    yield HEARTBEAT_FRAME
+                    continue
+                if subscriber.lagged:
+                    # The queue held nothing but the reset
+                    subscriber.lagged = False
+                    self.resets += 1
+                yield frame
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def start(self) -> None:
+        if self.redis_url and self._task is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(self.redis_url)
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(REDIS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        header, _, data = message["data"].partition(b"\n")
+                        header = orjson.loads(header)
+                        if header["origin"] == self.origin:
+                            continue
+                        self._deliver(self._frame(header["event"], data))
+                        self.relayed += 1
+            except Exception as e:
+                self.relay_failures += 1
+                logger.error("Verification event subscription failed", error=str(e))
+            # Events may have been missed while disconnected
+            self._deliver_reset()
+            await asyncio.sleep(1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "relayed": self.relayed,
+            "resets": self.resets,
+            "relay_failures": self.relay_failures,
+            "shared": self._redis is not None,
+        }
+
+
+verification_events = VerificationBroadcaster(
+    queue_size=settings.verification_events_queue_size,
+    replay_size=settings.verification_events_replay_size,
+    redis_url=settings.verification_events_redis_url,
+)
@@ -0,0 +1,35 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import UploadFile
+from sqlalchemy import Delete, Insert, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from app.core.logging import get_logger
+from app.models.file import FileBlob, FileRef
+from app.services.storage import StorageService, StoredFile
+
+logger = get_logger(__name__)
+
+def upsert_blob(stored: StoredFile, content_type: Optional[str] = None) -> Insert:
+    """INSERT recording the blob behind ``stored``, or refreshing it if an
+    identical upload already created it."""
+    return (
+        insert(FileBlob)
+        .values(key=stored.key, sha256=stored.sha256, size=stored.size, content_type=content_type)
+        .on_conflict_do_update(index_elements=["key"], set_={"last_referenced_at": func.now()})
+    )
+
+async def ensure_stored(
+    storage_service: StorageService, stored: StoredFile, file: UploadFile, directory: str, max_size: Optional[int] = None
+) -> StoredFile:
+    """Call after upsert_blob, before committing. The upsert locks the blob
+    row until commit and scripts/gc_blobs.py only deletes files of rows it
+    has locked, so from here on the bytes stay. If GC removed them after
+    save_file found them present, they are written again."""
+    if await storage_service.exists(stored.key):
+        return stored
+    logger.warning("Deduplicated upload was garbage collected, storing it again", key=stored.key)
+    return await storage_service.save_file(file, directory=directory, max_size=max_size)
+
+def delete_refs(owner_type: str, owner_id: UUID) -> Delete:
+    """DELETE of an owner's references; the blobs themselves are left to GC."""
+    return delete(FileRef).where(FileRef.owner_type == owner_type, FileRef.owner_id == owner_id)
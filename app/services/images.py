@@ -0,0 +1,193 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Set
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.storage import get_storage_service
+
+logger = get_logger(__name__)
+
+# variant -> (longest side in px, JPEG quality)
+VARIANTS: Dict[str, tuple[int, int]] = {
+    "review": (1600, 80),
+    "thumbnail": (320, 70),
+}
+
+
+def derived_key(key: str, variant: str) -> str:
+    """Storage key of a derived image, e.g. payment_proofs/derived/<name>.thumbnail.jpg"""
+    directory, filename = os.path.split(key)
+    stem = os.path.splitext(filename)[0]
+    return f"{directory}/derived/{stem}.{variant}.jpg" if directory else f"derived/{stem}.{variant}.jpg"
+
+
+def render_variants(data: bytes) -> Dict[str, bytes]:
+    """Decode once and encode every variant as progressive JPEG; empty if
+    ``data`` is not an image. Runs in a worker process, so Pillow is only
+    imported there."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    largest = max(size for size, _ in VARIANTS.values())
+    try:
+        image = Image.open(io.BytesIO(data))
+    except UnidentifiedImageError:
+        return {}
+    with image:
+        # JPEG only: let libjpeg decode at a reduced scale close to the
+        # largest variant instead of the full phone-camera resolution
+        image.draft("RGB", (largest, largest))
+        # Phone photos are usually stored sideways with an EXIF orientation
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        rendered = {}
+        for variant, (size, quality) in VARIANTS.items():
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            copy.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            rendered[variant] = out.getvalue()
+    return rendered
+
+
+class ImagePipeline:
+    """Produces review copies and thumbnails of uploaded images in a process
+    pool, off the request path.
+
+    ``schedule`` is fire-and-forget after an upload; ``ensure`` is awaited by
+    the media route and regenerates derived images that are missing (older
+    uploads, a lost cache directory). Concurrent requests for the same
+    source share one render.
+    """
+
+    def __init__(self, max_workers: int, cache_size: int, failure_ttl: float):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # Sources whose derived images are known to exist, and sources that
+        # are not images at all (bounded LRU, the TTL only ages out entries);
+        # sources that were missing or failed are not retried for a while
+        self._ready = TTLCache(maxsize=cache_size, ttl=24 * 60 * 60)
+        self._unsupported = TTLCache(maxsize=cache_size, ttl=24 * 60 * 60)
+        self._failed = TTLCache(maxsize=cache_size, ttl=failure_ttl)
+        self.generated = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # Not fork: the workers must not inherit the event loop,
+                # the database pool or locks held by other threads
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self._executor
+
+    def schedule(self, key: str) -> None:
+        task = asyncio.create_task(self.ensure(key))
+        # Keep a reference until done so the task is not garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def forget(self, key: str) -> None:
+        """Derived images of ``key`` went missing; the next ensure() re-checks."""
+        self._ready.delete(key)
+
+    async def ensure(self, key: str) -> bool:
+        """True once every derived image of ``key`` exists."""
+        if self._ready.get(key):
+            return True
+        if self._unsupported.get(key) or self._failed.get(key):
+            return False
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._generate(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _generate(self, key: str) -> bool:
+        storage_service = get_storage_service()
+        targets = {variant: derived_key(key, variant) for variant in VARIANTS}
+        try:
+            present = await asyncio.gather(*(storage_service.exists(target) for target in targets.values()))
+            if all(present):
+                self._ready.set(key, True)
+                return True
+
+            data = await storage_service.read_file(key)
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(self._get_executor(), render_variants, data)
+            elapsed = time.perf_counter() - started
+            if not rendered:
+                self._unsupported.set(key, True)
+                return False
+
+            await asyncio.gather(*(
+                storage_service.write_file(targets[variant], blob, "image/jpeg")
+                for variant, blob in rendered.items()
+            ))
+        except Exception as e:
+            # Missing or corrupt source, or a storage error; retried once the
+            # failure entry expires
+            self._failed.set(key, True)
+            self.failures += 1
+            logger.warning("Derived image generation failed", key=key, error=str(e))
+            return False
+
+        self.generated += 1
+        self.total_seconds += elapsed
+        self.bytes_in += len(data)
+        self.bytes_out += sum(len(blob) for blob in rendered.values())
+        self._ready.set(key, True)
+        logger.info(
+            "Derived images generated",
+            key=key,
+            source_bytes=len(data),
+            thumbnail_bytes=len(rendered["thumbnail"]),
+            review_bytes=len(rendered["review"]),
+            duration_ms=round(elapsed * 1000, 1),
+        )
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "generated": self.generated,
+            "failures": self.failures,
+            "in_flight": len(self._inflight),
+            "ready_cached": self._ready.stats()["size"],
+            "failed_cached": self._failed.stats()["size"],
+            "avg_ms": (self.total_seconds / self.generated * 1000) if self.generated else 0.0,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_pipeline = ImagePipeline(
+    max_workers=settings.image_workers,
+    cache_size=settings.image_state_cache_size,
+    failure_ttl=settings.image_failure_ttl_seconds,
+)
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Any, Dict, Optional
+
+import aiosmtplib
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logging import get_logger
+from app.models.outbox import EmailOutbox, OutboxStatus
+
+logger = get_logger(__name__)
+
+
+class OutboxSender:
+    """Background worker that drains the email outbox over one reused SMTP connection.
+
+    Every uvicorn worker runs its own sender; rows are claimed with
+    ``FOR UPDATE SKIP LOCKED`` so no message is sent twice.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self.sent = 0
+        self.failed_attempts = 0
+        self.dead = 0
+        self.batches = 0
+        self.send_seconds = 0.0
+        self.max_send_seconds = 0.0
+        self.lag_seconds = 0.0
+        self.last_batch_rate = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._disconnect()
+
+    def notify(self) -> None:
+        """Wake the sender after committing new outbox rows."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                logger.error("Email outbox drain failed", error=str(e))
+                processed = 0
+            if processed >= settings.outbox_batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.outbox_poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        # Claim a batch by pushing next_attempt_at out by the lease and commit,
+        # so no row lock or connection is held while talking to SMTP. A
+        # sender that dies mid-batch leaves its messages to be retried once
+        # the lease runs out.
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(EmailOutbox)
+                .where(
+                    EmailOutbox.status == OutboxStatus.PENDING,
+                    EmailOutbox.next_attempt_at <= datetime.now(timezone.utc),
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(settings.outbox_batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = result.scalars().all()
+            if not messages:
+                return 0
+            lease_until = datetime.now(timezone.utc) + timedelta(seconds=settings.outbox_lease_seconds)
+            for message in messages:
+                message.next_attempt_at = lease_until
+            await db.commit()
+
+        batch_started = time.perf_counter()
+        send_until = time.monotonic() + settings.outbox_lease_seconds - settings.outbox_smtp_timeout_seconds
+        outcomes = []
+        for message in messages:
+            if time.monotonic() > send_until:
+                # Left leased; picked up again when the lease expires
+                break
+            outcomes.append(await self._deliver(message))
+
+        if outcomes:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(EmailOutbox), outcomes)
+                await db.commit()
+
+        self.batches += 1
+        elapsed = time.perf_counter() - batch_started
+        self.last_batch_rate = len(outcomes) / elapsed if elapsed else 0.0
+        return len(messages)
+
+    async def _deliver(self, message: EmailOutbox) -> Dict[str, Any]:
+        """Send ``message``; returns the column values recording the outcome."""
+        started = time.perf_counter()
+        try:
+            await self._send(message)
+        except Exception as e:
+            attempts = message.attempts + 1
+            outcome: Dict[str, Any] = {"id": message.id, "attempts": attempts, "last_error": str(e)[:1000]}
+            self.failed_attempts += 1
+            if attempts >= settings.outbox_max_attempts:
+                outcome["status"] = OutboxStatus.FAILED
+                self.dead += 1
+                logger.error("Email permanently failed", outbox_id=str(message.id), error=str(e))
+            else:
+                backoff = min(
+                    settings.outbox_backoff_base_seconds * 2 ** (attempts - 1),
+                    settings.outbox_backoff_max_seconds,
+                )
+                outcome["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=backoff)
+                logger.warning("Email send failed, will retry", outbox_id=str(message.id), error=str(e))
+            await self._disconnect()
+            return outcome
+
+        elapsed = time.perf_counter() - started
+        now = datetime.now(timezone.utc)
+        # The body may carry a temporary password; keep it only until delivered.
+        outcome = {"id": message.id, "status": OutboxStatus.SENT, "sent_at": now, "body": "", "text_body": None}
+        self.sent += 1
+        self.send_seconds += elapsed
+        self.max_send_seconds = max(self.max_send_seconds, elapsed)
+        if message.created_at is not None:
+            self.lag_seconds += (now - message.created_at).total_seconds()
+        return outcome
+
+    async def _send(self, message: EmailOutbox) -> None:
+        email = EmailMessage()
+        email["From"] = formataddr((settings.mail_from_name, settings.mail_from))
+        email["To"] = message.recipient
+        email["Subject"] = message.subject
+        if message.text_body:
+            email.set_content(message.text_body)
+            email.add_alternative(message.body, subtype="html")
+        else:
+            email.set_content(message.body, subtype="html")
+
+        smtp = await self._connect()
+        try:
+            await smtp.send_message(email)
+        except aiosmtplib.SMTPServerDisconnected:
+            # Idle connections get closed by the server; reconnect once.
+            await self._disconnect()
+            smtp = await self._connect()
+            await smtp.send_message(email)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.mail_server,
+            port=settings.mail_port,
+            use_tls=settings.mail_ssl_tls,
+            start_tls=settings.mail_starttls,
+            validate_certs=settings.validate_certs,
+            timeout=settings.outbox_smtp_timeout_seconds,
+        )
+        await smtp.connect()
+        if settings.use_credentials:
+            await smtp.login(settings.mail_username, settings.mail_password)
+        self._smtp = smtp
+        return smtp
+
+    async def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "sent": self.sent,
+            "failed_attempts": self.failed_attempts,
+            "dead": self.dead,
+            "batches": self.batches,
+            "avg_send_ms": (self.send_seconds / self.sent * 1000) if self.sent else 0.0,
+            "max_send_ms": self.max_send_seconds * 1000,
+            "avg_queue_lag_ms": (self.lag_seconds / self.sent * 1000) if self.sent else 0.0,
+            "last_batch_messages_per_s": self.last_batch_rate,
+        }
+
+
+outbox_sender = OutboxSender()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Update, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logging import get_logger
+from app.models.token import RefreshToken, TokenRevocation
+
+logger = get_logger(__name__)
+
+# Rows are purged this often by each worker; any worker doing it is enough
+PURGE_INTERVAL_SECONDS = 600
+
+
+class RevocationList:
+    """In-memory copy of ``token_revocations`` checked on every request.
+
+    Revocations made by this worker apply immediately; those made by other
+    workers arrive with the next incremental sync, so the check itself never
+    queries. A sync reads rows with a higher id than seen so far plus rows
+    revoked shortly before the previous sync: ids are assigned at insert but
+    become visible at commit, so a lower id can appear after a higher one.
+    Applying a row twice is harmless. Entries are dropped once the tokens
+    they cover have expired, which keeps the set as small as the number of
+    revocations within one access token lifetime.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        # jti -> expiry timestamp
+        self._jtis: Dict[str, float] = {}
+        # subject -> (revoked at, expiry timestamp)
+        self._subjects: Dict[str, tuple[float, float]] = {}
+        self._last_id = 0
+        self._last_sync: Optional[datetime] = None
+        self._last_purge = 0.0
+        self.syncs = 0
+        self.sync_failures = 0
+        self.rejected = 0
+
+    def is_revoked(self, jti: Optional[str], subject: str, issued_at: Optional[float]) -> bool:
+        if jti is not None and jti in self._jtis:
+            self.rejected += 1
+            return True
+        entry = self._subjects.get(subject)
+        if entry is not None and (issued_at or 0) <= entry[0]:
+            self.rejected += 1
+            return True
+        return False
+
+    def _apply(self, row: TokenRevocation) -> None:
+        expires = row.expires_at.timestamp()
+        if row.jti:
+            self._jtis[row.jti] = expires
+        if row.subject:
+            revoked_at = row.revoked_at.timestamp()
+            current = self._subjects.get(row.subject)
+            if current is None or current[0] < revoked_at:
+                self._subjects[row.subject] = (revoked_at, expires)
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._jtis = {jti: expires for jti, expires in self._jtis.items() if expires > now}
+        self._subjects = {sub: entry for sub, entry in self._subjects.items() if entry[1] > now}
+
+    def revoke_token(self, db: AsyncSession, jti: str, expires_at: datetime) -> None:
+        """Revoke one access token. Takes effect in this worker at once and in
+        the others after the next sync; the row is committed with ``db``."""
+        row = TokenRevocation(jti=jti, revoked_at=datetime.now(timezone.utc), expires_at=expires_at)
+        db.add(row)
+        self._apply(row)
+
+    def revoke_subject(self, db: AsyncSession, subject: str) -> None:
+        """Revoke every access token issued to ``subject`` so far; tokens
+        issued afterwards are accepted."""
+        now = datetime.now(timezone.utc)
+        row = TokenRevocation(
+            subject=subject,
+            revoked_at=now,
+            expires_at=now + timedelta(minutes=settings.access_token_expire_minutes),
+        )
+        db.add(row)
+        self._apply(row)
+
+    async def sync_once(self) -> int:
+        started = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            query = select(TokenRevocation).where(TokenRevocation.expires_at > started).order_by(TokenRevocation.id)
+            if self._last_sync is not None:
+                overlap_from = self._last_sync - timedelta(seconds=settings.revocation_sync_overlap_seconds)
+                query = query.where(or_(TokenRevocation.id > self._last_id, TokenRevocation.revoked_at >= overlap_from))
+            result = await db.execute(query)
+            rows = result.scalars().all()
+            for row in rows:
+                self._apply(row)
+                self._last_id = max(self._last_id, row.id)
+            self._last_sync = started
+
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                self._prune()
+                await db.execute(
+                    delete(TokenRevocation).where(TokenRevocation.expires_at < datetime.now(timezone.utc))
+                )
+                await db.commit()
+        self.syncs += 1
+        return len(rows)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync_once()
+            except Exception as e:
+                self.sync_failures += 1
+                logger.error("Token revocation sync failed", error=str(e))
+            await asyncio.sleep(settings.revocation_sync_interval_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revoked_tokens": len(self._jtis),
+            "revoked_subjects": len(self._subjects),
+            "last_id": self._last_id,
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "rejected": self.rejected,
+        }
+
+
+revocation_list = RevocationList()
+
+
+def revoke_refresh_tokens(**where: Any) -> Update:
+    """UPDATE revoking the still valid refresh tokens matching ``where``
+    (e.g. ``user_id=...`` or ``family_id=...``)."""
+    return (
+        update(RefreshToken)
+        .where(*(getattr(RefreshToken, name) == value for name, value in where.items()))
+        .where(RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
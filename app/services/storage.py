@@ -1,65 +1,551 @@
-import shutil
+import base64
+import hashlib
 import os
-import boto3
-from botocore.exceptions import ClientError
-from fastapi import UploadFile
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from urllib.parse import quote
+from dataclasses import dataclass
+from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from abc import ABC, abstractmethod
-from uuid import uuid4
+from typing import Any, BinaryIO, Dict, List, Optional
+from app.core import security
 from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+@dataclass
+class StoredFile:
+    url: str
+    key: str
+    size: int
+    sha256: Optional[str] = None
+    deduplicated: bool = False # The same bytes were already stored under this key
+
+def content_key(directory: str, sha256: str, filename: Optional[str]) -> str:
+    """Content-addressed key: identical uploads to a directory share one blob."""
+    extension = os.path.splitext(filename or "")[1].lower()[:16]
+    prefix = f"{directory}/" if directory else ""
+    return f"{prefix}{sha256[:2]}/{sha256}{extension}"
+
+def _hash_stream(source: BinaryIO, max_size: int) -> tuple[int, str]:
+    sha256 = hashlib.sha256()
+    size = 0
+    source.seek(0)
+    while chunk := source.read(settings.upload_chunk_size_bytes):
+        size += len(chunk)
+        if size > max_size:
+            raise _too_large(max_size)
+        sha256.update(chunk)
+    return size, sha256.hexdigest()
+
+@dataclass
+class UploadedChunk:
+    index: int
+    size: int
+    sha256: str
+    etag: Optional[str] = None
 
 class StorageService(ABC):
     @abstractmethod
-    async def save_file(self, file: UploadFile, directory: str) -> str:
-        """Save file and return the path/url"""
+    async def save_file(self, file: UploadFile, directory: str, max_size: Optional[int] = None) -> StoredFile:
+        """Save file under its content-addressed key and return where it was
+        stored; bytes already stored are not written again. ``max_size``
+        defaults to settings.max_upload_size_bytes."""
+        pass
+
+    @abstractmethod
+    def signed_url(self, key: str, expires_in: int) -> str:
+        """Short-lived URL granting read access to a private file"""
+        pass
+
+    @abstractmethod
+    async def delete_file(self, key: str) -> None:
+        """Remove a previously saved file; missing files are ignored"""
+        pass
+
+    @abstractmethod
+    async def read_file(self, key: str) -> bytes:
+        """Contents of a stored file; raises FileNotFoundError if it does not exist"""
+        pass
+
+    @abstractmethod
+    async def write_file(self, key: str, data: bytes, content_type: Optional[str] = None) -> StoredFile:
+        """Store ``data`` under exactly ``key``, replacing any existing file"""
+        pass
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def start_chunked_upload(self, key: str, size: int, content_type: Optional[str]) -> Optional[str]:
+        """Prepare a resumable upload of ``size`` bytes; returns the backend upload id, if any"""
+        pass
+
+    @abstractmethod
+    async def write_chunk(
+        self, key: str, upload_id: Optional[str], index: int, offset: int, source: BinaryIO, sha256: bytes
+    ) -> Optional[str]:
+        """Store one chunk of a resumable upload, read from ``source``; chunks
+        may arrive in any order and concurrently"""
+        pass
+
+    @abstractmethod
+    async def chunked_upload_sha256(self, key: str, upload_id: Optional[str]) -> Optional[str]:
+        """SHA-256 of a fully received resumable upload, or None if the
+        backend cannot compute it without reading the file back"""
         pass
 
+    @abstractmethod
+    async def complete_chunked_upload(
+        self, key: str, upload_id: Optional[str], chunks: List[UploadedChunk], blob_key: Optional[str] = None
+    ) -> StoredFile:
+        """Assemble the received chunks, in index order, into the final file,
+        stored under ``blob_key`` if given and supported"""
+        pass
+
+    @abstractmethod
+    async def abort_chunked_upload(self, key: str, upload_id: Optional[str]) -> None:
+        """Discard a resumable upload and everything written for it so far"""
+        pass
+
+class UploadMetrics:
+    def __init__(self):
+        self.uploads = 0
+        self.failures = 0
+        self.deduplicated = 0
+        self.bytes = 0
+        self.bytes_deduplicated = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, size: int, seconds: float, ok: bool = True, deduplicated: bool = False) -> None:
+        if not ok:
+            self.failures += 1
+            return
+        if deduplicated:
+            self.deduplicated += 1
+            self.bytes_deduplicated += size
+        self.uploads += 1
+        self.bytes += size
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uploads": self.uploads,
+            "failures": self.failures,
+            "deduplicated": self.deduplicated,
+            "bytes": self.bytes,
+            "bytes_deduplicated": self.bytes_deduplicated,
+            "avg_ms": (self.total_seconds / self.uploads * 1000) if self.uploads else 0.0,
+            "max_ms": self.max_seconds * 1000,
+            "throughput_bytes_per_s": (self.bytes / self.total_seconds) if self.total_seconds else 0.0,
+        }
+
+upload_metrics = UploadMetrics()
+
+def _upload_gone() -> HTTPException:
+    # The backend no longer has the upload: it was completed or cancelled
+    return HTTPException(status_code=409, detail="Upload is no longer in progress")
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File is too large. Maximum size is {max_size} bytes.",
+    )
+
 class LocalStorageService(StorageService):
     def __init__(self, base_path: str = "uploads"):
         self.base_path = base_path
         os.makedirs(self.base_path, exist_ok=True)
 
-    async def save_file(self, file: UploadFile, directory: str = "") -> str:
+    async def save_file(self, file: UploadFile, directory: str = "", max_size: Optional[int] = None) -> StoredFile:
         upload_dir = os.path.join(self.base_path, directory)
         os.makedirs(upload_dir, exist_ok=True)
-        
-        filename = f"{uuid4()}_{file.filename}"
-        file_path = os.path.join(upload_dir, filename)
-        
-        return f"/api/v1/static/{directory}/{filename}" if directory else f"/api/v1/static/{filename}"
+
+        # The whole copy runs in one worker thread: the event loop is never
+        # blocked and at most one chunk is held in memory at a time. The key
+        # is only known once the hash is, so the copy goes to a temp file.
+        started = time.perf_counter()
+        try:
+            key, size, digest, deduplicated = await run_in_threadpool(
+                self._store_stream, file.file, directory, file.filename, max_size or settings.max_upload_size_bytes
+            )
+        except Exception:
+            upload_metrics.record(0, 0.0, ok=False)
+            raise
+        upload_metrics.record(size, time.perf_counter() - started, deduplicated=deduplicated)
+
+        return StoredFile(
+            url=f"{settings.api_v1_prefix}/static/{key}", key=key, size=size, sha256=digest, deduplicated=deduplicated
+        )
+
+    def _store_stream(
+        self, source: BinaryIO, directory: str, filename: Optional[str], max_size: int
+    ) -> tuple[str, int, str, bool]:
+        tmp_path, size, digest = self._write_stream(source, os.path.join(self.base_path, directory), max_size)
+        key = content_key(directory, digest, filename)
+        file_path = os.path.join(self.base_path, key)
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if os.path.exists(file_path):
+                return key, size, digest, True
+            os.replace(tmp_path, file_path)
+            return key, size, digest, False
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    async def delete_file(self, key: str) -> None:
+        file_path = os.path.join(self.base_path, key)
+        try:
+            await run_in_threadpool(os.remove, file_path)
+        except FileNotFoundError:
+            pass
+
+    async def read_file(self, key: str) -> bytes:
+        return await run_in_threadpool(self._read, os.path.join(self.base_path, key))
+
+    async def write_file(self, key: str, data: bytes, content_type: Optional[str] = None) -> StoredFile:
+        await run_in_threadpool(self._write_atomic, os.path.join(self.base_path, key), data)
+        return StoredFile(url=f"{settings.api_v1_prefix}/static/{key}", key=key, size=len(data))
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(os.path.isfile, os.path.join(self.base_path, key))
+
+    def _read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    async def start_chunked_upload(self, key: str, size: int, content_type: Optional[str]) -> Optional[str]:
+        await run_in_threadpool(self._allocate, self._staging_path(key), size)
+        return None
+
+    async def write_chunk(
+        self, key: str, upload_id: Optional[str], index: int, offset: int, source: BinaryIO, sha256: bytes
+    ) -> Optional[str]:
+        try:
+            await run_in_threadpool(self._write_at, self._staging_path(key), offset, source)
+        except FileNotFoundError:
+            raise _upload_gone()
+        return None
+
+    async def chunked_upload_sha256(self, key: str, upload_id: Optional[str]) -> Optional[str]:
+        return await run_in_threadpool(self._hash_file, self._staging_path(key))
+
+    async def complete_chunked_upload(
+        self, key: str, upload_id: Optional[str], chunks: List[UploadedChunk], blob_key: Optional[str] = None
+    ) -> StoredFile:
+        blob_key = blob_key or key
+        file_path = os.path.join(self.base_path, blob_key)
+        size, deduplicated = await run_in_threadpool(self._publish, self._staging_path(key), file_path)
+        return StoredFile(
+            url=f"{settings.api_v1_prefix}/static/{blob_key}", key=blob_key, size=size, deduplicated=deduplicated
+        )
+
+    async def abort_chunked_upload(self, key: str, upload_id: Optional[str]) -> None:
+        try:
+            await run_in_threadpool(os.remove, self._staging_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _staging_path(self, key: str) -> str:
+        # Outside base_path so partial files are never served
+        return os.path.join(settings.resumable_staging_dir, key.replace("/", "_") + ".part")
+
+    def _allocate(self, path: str, size: int) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            # Sparse file of the final size; each chunk is written at its own offset
+            f.truncate(size)
+
+    def _write_at(self, path: str, offset: int, source: BinaryIO) -> None:
+        # pwrite does not move a shared file position, so concurrent chunk
+        # requests can write into the same file without coordinating.
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            source.seek(0)
+            while chunk := source.read(settings.upload_chunk_size_bytes):
+                view = memoryview(chunk)
+                while view:
+                    written = os.pwrite(fd, view, offset)
+                    view = view[written:]
+                    offset += written
+            # A chunk is only recorded as received once it is on disk
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _hash_file(self, path: str) -> str:
+        with open(path, "rb") as f:
+            return _hash_stream(f, os.fstat(f.fileno()).st_size)[1]
+
+    def _publish(self, staging_path: str, file_path: str) -> tuple[int, bool]:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if os.path.exists(file_path):
+            # Content-addressed and already stored
+            os.remove(staging_path)
+            return os.path.getsize(file_path), True
+        # A rename when staging and uploads share a filesystem
+        shutil.move(staging_path, file_path)
+        return os.path.getsize(file_path), False
+
+    def signed_url(self, key: str, expires_in: int) -> str:
+        expires = int(time.time()) + expires_in
+        signature = security.sign_media_path(key, expires)
+        return f"{settings.api_v1_prefix}/videos/stream/{quote(key)}?expires={expires}&signature={signature}"
+
+    def _write_stream(self, source: BinaryIO, directory: str, max_size: int) -> tuple[str, int, str]:
+        """Copy ``source`` to a temp file in ``directory``, hashing as it goes"""
+        chunk_size = settings.upload_chunk_size_bytes
+        sha256 = hashlib.sha256()
+        size = 0
+
+        source.seek(0)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := source.read(chunk_size):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise _too_large(max_size)
+                    sha256.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return tmp_path, size, sha256.hexdigest()
     
+@lru_cache
+def get_s3_client():
+    # boto3 is imported here rather than at module level: it is slow to
+    # import and local-storage deployments never need it.
+    import boto3
+    from botocore.config import Config
+
+    # boto3 clients are thread-safe; one client with a connection pool large
+    # enough for concurrent multipart parts is shared by every upload.
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+        region_name=settings.aws_region,
+        endpoint_url=settings.s3_endpoint_url,
+        config=Config(max_pool_connections=settings.s3_max_pool_connections),
+    )
+
+@lru_cache
+def get_cloudfront_signer():
+    from botocore.signers import CloudFrontSigner
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    with open(settings.cloudfront_private_key_path, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+
+    def rsa_signer(message: bytes) -> bytes:
+        return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+
+    return CloudFrontSigner(settings.cloudfront_key_pair_id, rsa_signer)
+
 class S3StorageService(StorageService):
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region
-        )
+        from boto3.s3.transfer import TransferConfig
+
+        self.s3_client = get_s3_client()
         self.bucket_name = settings.s3_bucket_name
         self.cloudfront_domain = settings.cloudfront_domain
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.s3_multipart_threshold_bytes,
+            multipart_chunksize=settings.s3_multipart_chunk_size_bytes,
+            max_concurrency=settings.s3_max_concurrency,
+            use_threads=True,
+        )
+
+    async def save_file(self, file: UploadFile, directory: str = "", max_size: Optional[int] = None) -> StoredFile:
+        from botocore.exceptions import ClientError
 
-    async def save_file(self, file: UploadFile, directory: str = "") -> str:
-        filename = f"{directory}/{uuid4()}_{file.filename}"
-        
+        max_size = max_size or settings.max_upload_size_bytes
+        if file.size is not None and file.size > max_size:
+            raise _too_large(max_size)
+
+        started = time.perf_counter()
+        # The upload is already spooled locally; hashing it first lets a
+        # repeat skip the transfer to S3 entirely.
+        size, digest = await run_in_threadpool(_hash_stream, file.file, max_size)
+        key = content_key(directory, digest, file.filename)
         try:
-            self.s3_client.upload_fileobj(
-                file.file,
-                self.bucket_name,
-                filename,
-                ExtraArgs={'ContentType': file.content_type}
-            )
+            deduplicated = await self.exists(key)
+            if not deduplicated:
+                await run_in_threadpool(self._upload, file.file, key, file.content_type)
         except ClientError as e:
-            # Log the error here
-            print(f"Error uploading to S3: {e}")
+            upload_metrics.record(0, 0.0, ok=False)
+            logger.error("S3 upload failed", key=key, error=str(e))
             raise e
+        elapsed = time.perf_counter() - started
+        upload_metrics.record(size, elapsed, deduplicated=deduplicated)
+        logger.info(
+            "S3 upload complete", key=key, bytes=size, deduplicated=deduplicated, duration_ms=round(elapsed * 1000, 1)
+        )
+
+        return StoredFile(url=self.url_for(key), key=key, size=size, sha256=digest, deduplicated=deduplicated)
 
+    def _upload(self, source: BinaryIO, key: str, content_type: Optional[str]) -> None:
+        source.seek(0)
+        self.s3_client.upload_fileobj(
+            source,
+            self.bucket_name,
+            key,
+            ExtraArgs={'ContentType': content_type or "application/octet-stream"},
+            Config=self.transfer_config,
+        )
+
+    async def delete_file(self, key: str) -> None:
+        await run_in_threadpool(self.s3_client.delete_object, Bucket=self.bucket_name, Key=key)
+
+    async def read_file(self, key: str) -> bytes:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = await run_in_threadpool(self.s3_client.get_object, Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        return await run_in_threadpool(response["Body"].read)
+
+    async def write_file(self, key: str, data: bytes, content_type: Optional[str] = None) -> StoredFile:
+        await run_in_threadpool(
+            self.s3_client.put_object,
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=data,
+            ContentType=content_type or "application/octet-stream",
+        )
+        return StoredFile(url=self.url_for(key), key=key, size=len(data))
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await run_in_threadpool(self.s3_client.head_object, Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return False
+            raise
+        return True
+
+    # Resumable uploads map one-to-one onto S3 multipart uploads: chunk N is
+    # part N + 1 and S3 verifies each part against its SHA-256.
+    async def start_chunked_upload(self, key: str, size: int, content_type: Optional[str]) -> Optional[str]:
+        response = await run_in_threadpool(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=key,
+            ContentType=content_type or "application/octet-stream",
+            ChecksumAlgorithm="SHA256",
+        )
+        return response["UploadId"]
+
+    async def write_chunk(
+        self, key: str, upload_id: Optional[str], index: int, offset: int, source: BinaryIO, sha256: bytes
+    ) -> Optional[str]:
+        from botocore.exceptions import ClientError
+
+        source.seek(0)
+        try:
+            response = await run_in_threadpool(
+                self.s3_client.upload_part,
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=index + 1,
+                Body=source,
+                ChecksumSHA256=base64.b64encode(sha256).decode(),
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+                raise _upload_gone()
+            raise
+        return response["ETag"]
+
+    async def chunked_upload_sha256(self, key: str, upload_id: Optional[str]) -> Optional[str]:
+        # Part checksums do not combine into the object's SHA-256
+        return None
+
+    async def complete_chunked_upload(
+        self, key: str, upload_id: Optional[str], chunks: List[UploadedChunk], blob_key: Optional[str] = None
+    ) -> StoredFile:
+        # The object can only be completed under the key the multipart upload
+        # was started with, so blob_key is not used
+        parts = [
+            {
+                "PartNumber": chunk.index + 1,
+                "ETag": chunk.etag,
+                "ChecksumSHA256": base64.b64encode(bytes.fromhex(chunk.sha256)).decode(),
+            }
+            for chunk in chunks
+        ]
+        await run_in_threadpool(
+            self.s3_client.complete_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        return StoredFile(url=self.url_for(key), key=key, size=sum(chunk.size for chunk in chunks))
+
+    async def abort_chunked_upload(self, key: str, upload_id: Optional[str]) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            await run_in_threadpool(
+                self.s3_client.abort_multipart_upload, Bucket=self.bucket_name, Key=key, UploadId=upload_id
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                raise
+
+    def signed_url(self, key: str, expires_in: int) -> str:
+        # Both variants are computed locally; no request is made to AWS.
+        if self.cloudfront_domain and settings.cloudfront_key_pair_id and settings.cloudfront_private_key_path:
+            expires = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+            return get_cloudfront_signer().generate_presigned_url(self.url_for(key), date_less_than=expires)
+        return self.s3_client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket_name, "Key": key}, ExpiresIn=expires_in
+        )
+
+    def url_for(self, key: str) -> str:
         if self.cloudfront_domain:
-            return f"https://{self.cloudfront_domain}/{filename}"
-        return f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{filename}"
+            return f"https://{self.cloudfront_domain}/{key}"
+        if settings.s3_endpoint_url:
+            return f"{settings.s3_endpoint_url.rstrip('/')}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{key}"
 
+@lru_cache
 def get_storage_service() -> StorageService:
+    """Storage backend, created on first use and shared afterwards."""
     if settings.aws_access_key_id and settings.s3_bucket_name:
         return S3StorageService()
     return LocalStorageService()
-
-storage_service = get_storage_service()
@@ -0,0 +1,44 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+
+@dataclass
+class RenderedEmail:
+    subject: str
+    html: str
+    text: Optional[str] = None
+
+
+class EmailTemplates:
+    """Compiles every email template once and keeps the compiled objects.
+
+    ``<name>.html`` is rendered with HTML auto-escaping; an optional
+    ``<name>.txt`` next to it becomes the plain-text alternative.
+    """
+
+    def __init__(self, directory: str = TEMPLATE_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(enabled_extensions=("html",), default=False),
+            auto_reload=False,
+            keep_trailing_newline=True,
+        )
+        self._compiled: Dict[str, Template] = {}
+
+    def load(self) -> None:
+        if self._compiled:
+            return
+        self._compiled = {name: self.env.get_template(name) for name in self.env.list_templates()}
+
+    def render(self, name: str, subject: str, **context: Any) -> RenderedEmail:
+        self.load()
+        html = self._compiled[f"{name}.html"].render(context)
+        text_template = self._compiled.get(f"{name}.txt")
+        text = text_template.render(context) if text_template is not None else None
+        return RenderedEmail(subject=subject, html=html, text=text)
+
+
+email_templates = EmailTemplates()
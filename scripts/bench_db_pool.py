@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.database import build_engine
+
+# Simulates request handlers that each hold a connection for one short query.
+QUERY = text("SELECT pg_sleep(:hold)")
+
+async def run_case(pool_size: int, max_overflow: int, concurrency: int, duration: float, hold: float):
+    engine = build_engine(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=5)
+    done = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal done, errors
+        while time.perf_counter() < deadline:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(QUERY, {"hold": hold})
+                done += 1
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = engine.pool.stats()
+    await engine.dispose()
+    print(
+        f"pool={pool_size:3d} overflow={max_overflow:3d} clients={concurrency:4d} "
+        f"{done / elapsed:8.0f} q/s  errors={errors:4d}  "
+        f"avg_wait={stats['avg_wait_ms']:7.2f} ms  max_wait={stats['max_wait_ms']:8.2f} ms  "
+        f"timeouts={stats['timeouts']}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description="Throughput of the connection pool at different sizes")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--hold-ms", type=float, default=5.0, help="time each query holds its connection")
+    parser.add_argument("--sizes", default="2,5,10,20,40")
+    parser.add_argument("--max-overflow", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        await run_case(size, args.max_overflow, args.concurrency, args.duration, args.hold_ms / 1000)
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+import sys
+import os
+import timeit
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.templates import EmailTemplates
+
+RUNS = 20000
+
+def render_inline(email: str, password: str) -> str:
+    # The previous f-string implementation, for comparison (no escaping)
+    return f"""
+    <h1>Welcome to AKM SIR BIOLOGY</h1>
+    <p>Your account has been approved.</p>
+    <p><b>Username:</b> {email}</p>
+    <p><b>Temporary Password:</b> {password}</p>
+    <p>Please login and change your password immediately.</p>
+    """
+
+def main():
+    templates = EmailTemplates()
+    load_time = timeit.timeit(templates.load, number=1)
+    print(f"Template load + compile: {load_time * 1000:.2f} ms")
+
+    cases = {
+        "inline f-string (html only)": lambda: render_inline("student@example.com", "Ab3dEf6hIj9k"),
+        "welcome (html + text)": lambda: templates.render(
+            "welcome", "Account Approved", email="student@example.com", password="Ab3dEf6hIj9k"
+        ),
+        "rejection (html + text)": lambda: templates.render(
+            "rejection", "Registration Update", reason="Blurry <b>screenshot</b> & wrong amount"
+        ),
+    }
+    for name, fn in cases.items():
+        elapsed = timeit.timeit(fn, number=RUNS)
+        print(f"{name:30s} {elapsed / RUNS * 1e6:8.2f} us/render  {RUNS / elapsed:10.0f} renders/s")
+
+if __name__ == "__main__":
+    main()
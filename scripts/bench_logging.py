@@ -0,0 +1,96 @@
+import argparse
+import io
+import logging
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import structlog
+from app.core import logging as app_logging
+from app.core.config import settings
+
+
+class SlowSink(io.TextIOBase):
+    """Stand-in for a slow stdout consumer (e.g. a backed-up log shipper)."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, s: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return len(s)
+
+
+def configure_previous(stream) -> None:
+    # The setup before the queue handler: stdlib json, synchronous writes
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer(),
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def run(name: str, calls: int) -> None:
+    logger = structlog.get_logger("bench")
+    started = time.perf_counter()
+    for i in range(calls):
+        logger.info("request handled", path="/api/v1/admin/verifications", status=200, duration_ms=12.5, i=i)
+    elapsed = time.perf_counter() - started
+    print(f"{name:40s} {elapsed / calls * 1e6:8.2f} us/call (caller thread)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call logging cost on the request path")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--sink-delay-us", type=float, default=50.0, help="simulated cost of each write")
+    args = parser.parse_args()
+    delay = args.sink_delay_us / 1e6
+
+    configure_previous(SlowSink(delay))
+    run("previous (json + sync write)", args.calls)
+
+    settings.log_format = "json"
+    settings.log_queue_enabled = False
+    app_logging.configure_logging(SlowSink(delay))
+    run("orjson + sync write", args.calls)
+
+    settings.log_queue_enabled = True
+    settings.log_queue_size = args.calls + 1
+    app_logging.configure_logging(SlowSink(delay))
+    run("orjson + queue (no drops)", args.calls)
+    started = time.perf_counter()
+    app_logging.shutdown_logging()
+    print(f"{'  queue drain on shutdown':40s} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    settings.log_queue_size = 1000
+    app_logging.configure_logging(SlowSink(delay))
+    run("orjson + queue (size 1000, drop on full)", args.calls)
+    print(f"{'  dropped':40s} {app_logging.log_stats()['dropped']:8d}")
+    app_logging.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import json
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.core.responses import ORJSONResponse, model_response
+from app.schemas.user import UserResponse
+
+RUNS = 5
+
+def make_rows(n: int) -> list:
+    # Attribute objects standing in for ORM rows
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            email=f"student{i}@example.com",
+            is_active=False,
+            role="student",
+            must_change_password=False,
+            payment_proof=SimpleNamespace(
+                id=uuid.uuid4(),
+                file_path=f"/api/v1/static/payment_proofs/{uuid.uuid4()}_proof.jpg",
+                status="pending",
+                submitted_at=now,
+            ),
+        )
+        for i in range(n)
+    ]
+
+adapter = TypeAdapter(List[UserResponse])
+
+def previous(rows) -> bytes:
+    # FastAPI's classic path: validate response_model, jsonable_encoder, json.dumps
+    value = adapter.validate_python(rows, from_attributes=True)
+    return json.dumps(
+        jsonable_encoder(value), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def orjson_default(rows) -> bytes:
+    value = adapter.validate_python(rows, from_attributes=True)
+    return ORJSONResponse(jsonable_encoder(value)).body
+
+def validated(rows) -> bytes:
+    return model_response(List[UserResponse], rows).body
+
+def trusted(rows) -> bytes:
+    return model_response(List[UserResponse], rows, trusted=True).body
+
+def best_of(fn, rows) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    for n in (1000, 10000):
+        rows = make_rows(n)
+        expected = json.loads(previous(rows))
+        assert json.loads(validated(rows)) == expected == json.loads(trusted(rows))
+        print(f"{n} UserResponse rows")
+        for name, fn in (
+            ("validate + jsonable_encoder + json", previous),
+            ("validate + jsonable_encoder + orjson", orjson_default),
+            ("model_response (validate + dump_json)", validated),
+            ("model_response trusted (orjson, no validation)", trusted),
+        ):
+            print(f"  {name:48s} {best_of(fn, rows) * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
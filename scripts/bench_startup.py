@@ -0,0 +1,65 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+LIFESPAN_SNIPPET = """
+import asyncio, time
+from app.main import app
+
+async def main():
+    t = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        print(time.perf_counter() - t)
+
+asyncio.run(main())
+"""
+
+def run(snippet: str, extra_args=()) -> subprocess.CompletedProcess:
+    # A fresh interpreter per run so nothing is already imported
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", snippet],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+
+def measure(snippet: str, runs: int) -> list:
+    return [float(run(snippet).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+
+def slowest_imports(limit: int) -> list:
+    stderr = run("import app.main", ("-X", "importtime")).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Only whole packages, so a slow dependency shows up once
+        if "." in name:
+            continue
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and startup time of app.main")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # Keep the lifespan measurement to the app's own work
+    os.environ.setdefault("OUTBOX_ENABLED", "false")
+
+    imports = measure(IMPORT_SNIPPET, args.runs)
+    print(f"import app.main    median {statistics.median(imports) * 1000:8.1f} ms   min {min(imports) * 1000:8.1f} ms")
+    lifespans = measure(LIFESPAN_SNIPPET, args.runs)
+    print(f"lifespan startup   median {statistics.median(lifespans) * 1000:8.1f} ms   min {min(lifespans) * 1000:8.1f} ms")
+
+    print("\nSlowest packages (cumulative import time):")
+    for cumulative, name in slowest_imports(args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
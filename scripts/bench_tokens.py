@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.models.token import TokenRevocation
+from app.models.user import User
+from app.services.revocation import revocation_list
+
+class NoDatabase:
+    """get_current_user must not query on the hot path"""
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("unexpected query")
+
+def per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+async def per_call_us_async(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+def fill_revocations(tokens: int, subjects: int) -> None:
+    now = datetime.now(timezone.utc)
+    expires = now + timedelta(minutes=settings.access_token_expire_minutes)
+    for _ in range(tokens):
+        revocation_list._apply(TokenRevocation(jti=uuid.uuid4().hex, revoked_at=now, expires_at=expires))
+    for i in range(subjects):
+        revocation_list._apply(TokenRevocation(subject=f"revoked{i}@example.com", revoked_at=now, expires_at=expires))
+
+async def main():
+    parser = argparse.ArgumentParser(description="Access token validation on the request path")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--revoked-tokens", type=int, default=100000)
+    parser.add_argument("--revoked-subjects", type=int, default=10000)
+    args = parser.parse_args()
+
+    email = "student@example.com"
+    token = security.create_access_token(email)
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    user = User(id=uuid.uuid4(), email=email, hashed_password="x", role="student", is_active=True,
+                must_change_password=False)
+    deps.principal_cache.set(email, deps._snapshot_user(user))
+    db = NoDatabase()
+
+    decode = lambda: jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    check = lambda: revocation_list.is_revoked(payload["jti"], email, payload["iat"])
+    resolve = lambda: deps.get_current_user(db=db, token=token)
+
+    print(f"{'jwt.decode':50s} {per_call_us(decode, args.calls):8.2f} us/call")
+    print(f"{'revocation check (empty)':50s} {per_call_us(check, args.calls):8.3f} us/call")
+    print(f"{'get_current_user (empty list, cached principal)':50s} "
+          f"{await per_call_us_async(resolve, args.calls):8.2f} us/call")
+
+    fill_revocations(args.revoked_tokens, args.revoked_subjects)
+    label = f"{args.revoked_tokens} tokens + {args.revoked_subjects} subjects revoked"
+    print(f"{'revocation check (' + label + ')':50s} {per_call_us(check, args.calls):8.3f} us/call")
+    print(f"{'get_current_user (same, cached principal)':50s} "
+          f"{await per_call_us_async(resolve, args.calls):8.2f} us/call")
+
+    revoked = next(iter(revocation_list._jtis))
+    assert revocation_list.is_revoked(revoked, email, payload["iat"])
+    assert revocation_list.is_revoked(None, "revoked0@example.com", payload["iat"])
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timezone
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, engine
+from app.models.upload import UploadSession, UploadStatus
+from app.services.storage import get_storage_service
+
+async def cleanup_uploads():
+    """Discard resumable uploads that expired before being completed."""
+    storage_service = get_storage_service()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(UploadSession)
+            .where(
+                UploadSession.status == UploadStatus.PENDING,
+                UploadSession.expires_at < datetime.now(timezone.utc),
+            )
+            .with_for_update(skip_locked=True)
+        )
+        uploads = result.scalars().all()
+        for upload in uploads:
+            await storage_service.abort_chunked_upload(upload.storage_key, upload.backend_upload_id)
+            await db.delete(upload)
+        await db.commit()
+        print(f"Removed {len(uploads)} expired upload(s)")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(cleanup_uploads())
@@ -6,15 +6,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import select
-from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.database import AsyncSessionLocal
 from app.models.user import User, UserRole
 from app.core.security import get_password_hash
 from app.core.config import settings
 
 async def create_admin():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
+    # Expects the schema to exist: run `alembic upgrade head` first
     async with AsyncSessionLocal() as db:
         email = settings.admin_email
         password = settings.admin_password
@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, exists, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.file import FileBlob, FileRef
+from app.services.images import VARIANTS, derived_key
+from app.services.storage import get_storage_service
+
+BATCH_SIZE = 500
+
+async def gc_blobs(grace_hours: int, dry_run: bool):
+    """Delete stored files that no upload references any more."""
+    storage_service = get_storage_service()
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    unreferenced = select(FileBlob.key).where(
+        FileBlob.last_referenced_at < cutoff,
+        ~exists().where(FileRef.blob_key == FileBlob.key),
+    )
+    removed = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            if dry_run:
+                result = await db.execute(unreferenced)
+                keys = result.scalars().all()
+                for key in keys:
+                    print(key)
+                print(f"{len(keys)} unreferenced blob(s)")
+                break
+            # Uploads upsert the blob row, locking it, before relying on the
+            # stored bytes (app.services.files.ensure_stored). Rows are locked
+            # here while their files are deleted: a concurrent upload either
+            # holds the lock (skipped), refreshed last_referenced_at (re-checked
+            # under the lock, excluded), or waits for this commit and then
+            # stores the bytes again.
+            result = await db.execute(
+                unreferenced.limit(BATCH_SIZE).with_for_update(skip_locked=True)
+            )
+            keys = result.scalars().all()
+            if not keys:
+                break
+            # Derived images (thumbnails, review copies) go with their source
+            targets = list(keys) + [derived_key(key, variant) for key in keys for variant in VARIANTS]
+            await asyncio.gather(*(storage_service.delete_file(target) for target in targets))
+            await db.execute(delete(FileBlob).where(FileBlob.key.in_(keys)))
+            await db.commit()
+        removed += len(keys)
+    if not dry_run:
+        print(f"Removed {removed} unreferenced blob(s)")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reclaim storage of unreferenced uploads")
+    parser.add_argument("--grace-hours", type=int, default=settings.blob_gc_grace_hours)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(gc_blobs(args.grace_hours, args.dry_run))
@@ -0,0 +1,25 @@
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+def prepare_metrics_dir():
+    """Empty METRICS_MULTIPROC_DIR before launching workers, e.g.
+
+        python scripts/prepare_metrics_dir.py && uvicorn app.main:app --workers 4
+
+    Samples left by the previous run would otherwise be merged into the new
+    run's counters."""
+    if not settings.metrics_enabled or not settings.metrics_multiproc_dir:
+        print("Multiprocess metrics are not configured")
+        return
+    from app.core.metrics import prepare_multiprocess_dir
+
+    prepare_multiprocess_dir()
+    print(f"Cleared {settings.metrics_multiproc_dir}")
+
+if __name__ == "__main__":
+    prepare_metrics_dir()
@@ -5,19 +5,30 @@ import os
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
 from app.core.database import engine, Base
-from app.models import user  # Import models to register them
+from app.models import user, outbox, video, upload, token, file  # Import models to register them
 
-async def reset_database():
-    print("Resetting database...")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def drop_database():
     async with engine.begin() as conn:
         print("Dropping all tables...")
         await conn.run_sync(Base.metadata.drop_all)
-        print("Creating all tables...")
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    await engine.dispose()
+
+def reset_database():
+    print("Resetting database...")
+    asyncio.run(drop_database())
+    print("Applying migrations...")
+    # Runs outside the event loop above: alembic's env.py starts its own
+    command.upgrade(Config(os.path.join(ROOT, "alembic.ini")), "head")
     print("Database reset complete.")
 
 if __name__ == "__main__":
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.run(reset_database())
+    reset_database()
@@ -0,0 +1,13 @@
+import pytest
+
+from app.api.v1.endpoints.admin import _csv_cell
+
+
+@pytest.mark.parametrize("value", ["+977-9812345678", "+977 98 1234 5678", "+1 (555) 010-0100", "-5", "Kathmandu"])
+def test_plain_values_are_exported_unchanged(value):
+    assert _csv_cell(value) == value
+
+
+@pytest.mark.parametrize("value", ["=1+2", "+SUM(A1)", "-2+3+cmd|' /C calc'!A0", "@x", "+"])
+def test_formulas_are_quoted(value):
+    assert _csv_cell(value) == "'" + value
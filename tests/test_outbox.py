@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.models.outbox import EmailOutbox, OutboxStatus
+from app.services import outbox
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-send: not caught by _deliver."""
+
+
+class RecordingSender(outbox.OutboxSender):
+    # SMTP stand-in: records what would have been sent, or raises ``error``
+    def __init__(self, error: Optional[BaseException] = None):
+        super().__init__()
+        self.error = error
+        self.delivered = []
+
+    async def _send(self, message: EmailOutbox) -> None:
+        if self.error is not None:
+            raise self.error
+        self.delivered.append(message.recipient)
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    # SQLite ignores FOR UPDATE SKIP LOCKED; these tests run one sender at a
+    # time and cover the lease and the recorded outcomes, not the row locks.
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(EmailOutbox.__table__.create)
+        async with factory() as db:
+            db.add(EmailOutbox(
+                recipient="student@example.com",
+                subject="Welcome",
+                body="<p>Hi</p>",
+                next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            ))
+            await db.flush()
+            # SQLite hands datetimes back without a timezone, which the
+            # queue lag metric cannot subtract from
+            await db.execute(update(EmailOutbox).values(created_at=None))
+            await db.commit()
+
+    asyncio.run(create())
+    monkeypatch.setattr(outbox, "AsyncSessionLocal", factory)
+    yield factory
+    asyncio.run(engine.dispose())
+
+
+def _row(factory) -> EmailOutbox:
+    async def load():
+        async with factory() as db:
+            return (await db.execute(select(EmailOutbox))).scalar_one()
+    return asyncio.run(load())
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def test_claimed_message_is_sent_again_after_the_lease(sessions):
+    with pytest.raises(Crash):
+        asyncio.run(RecordingSender(error=Crash()).drain_once())
+
+    row = _row(sessions)
+    assert row.status == OutboxStatus.PENDING
+    assert row.attempts == 0
+    lease_left = (_utc(row.next_attempt_at) - datetime.now(timezone.utc)).total_seconds()
+    assert settings.outbox_lease_seconds - 10 < lease_left <= settings.outbox_lease_seconds
+
+    # Still leased: another sender leaves it alone
+    sender = RecordingSender()
+    assert asyncio.run(sender.drain_once()) == 0
+    assert sender.delivered == []
+
+    # Once the lease has run out it is claimed and sent
+    async def expire_lease():
+        async with sessions() as db:
+            await db.execute(
+                update(EmailOutbox).values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+            )
+            await db.commit()
+
+    asyncio.run(expire_lease())
+    assert asyncio.run(sender.drain_once()) == 1
+    assert sender.delivered == ["student@example.com"]
+    row = _row(sessions)
+    assert row.status == OutboxStatus.SENT
+    assert row.sent_at is not None
+    assert row.body == ""
+
+
+def test_failed_send_backs_off_instead_of_being_marked_sent(sessions):
+    sender = RecordingSender(error=OSError("connection refused"))
+    assert asyncio.run(sender.drain_once()) == 1
+
+    row = _row(sessions)
+    assert row.status == OutboxStatus.PENDING
+    assert row.sent_at is None
+    assert row.attempts == 1
+    assert row.last_error == "connection refused"
+    assert row.body == "<p>Hi</p>"
+    backoff = (_utc(row.next_attempt_at) - datetime.now(timezone.utc)).total_seconds()
+    assert settings.outbox_backoff_base_seconds - 10 < backoff <= settings.outbox_backoff_base_seconds
+    assert sender.stats()["failed_attempts"] == 1
+
+
+def test_message_fails_for_good_after_max_attempts(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 1)
+    sender = RecordingSender(error=OSError("mailbox unavailable"))
+    asyncio.run(sender.drain_once())
+
+    row = _row(sessions)
+    assert row.status == OutboxStatus.FAILED
+    assert sender.stats()["dead"] == 1
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import io
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import ANY, Stubber
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.services import storage
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    # A real client with its HTTP layer replaced by a Stubber: the service
+    # and s3transfer run unchanged and every S3 call is checked in order.
+    client = boto3.client(
+        "s3", aws_access_key_id="test", aws_secret_access_key="test", region_name="us-east-1"
+    )
+    monkeypatch.setattr(storage, "get_s3_client", lambda: client)
+    monkeypatch.setattr(storage, "upload_metrics", storage.UploadMetrics())
+    monkeypatch.setattr(settings, "s3_bucket_name", "test-bucket")
+    monkeypatch.setattr(settings, "cloudfront_domain", None)
+    # One transfer thread, so multipart parts are sent in order
+    monkeypatch.setattr(settings, "s3_max_concurrency", 1)
+    with Stubber(client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def _upload(data: bytes, filename: str = "proof.jpg") -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data), size=len(data), filename=filename, headers=Headers({"content-type": "image/jpeg"})
+    )
+
+
+def _key(data: bytes, directory: str = "payment_proofs", filename: str = "proof.jpg") -> str:
+    return storage.content_key(directory, hashlib.sha256(data).hexdigest(), filename)
+
+
+def test_save_file_skips_upload_when_content_exists(s3):
+    data = b"same bytes"
+    s3.add_response("head_object", {}, {"Bucket": "test-bucket", "Key": _key(data)})
+
+    stored = asyncio.run(storage.S3StorageService().save_file(_upload(data), "payment_proofs"))
+
+    assert stored.key == _key(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.deduplicated
+    stats = storage.upload_metrics.stats()
+    assert stats["uploads"] == 1
+    assert stats["deduplicated"] == 1
+    assert stats["bytes_deduplicated"] == len(data)
+
+
+def test_save_file_uploads_new_content_in_one_request(s3):
+    data = b"new bytes"
+    s3.add_client_error("head_object", service_error_code="404", http_status_code=404)
+    s3.add_response(
+        "put_object",
+        {},
+        {"Bucket": "test-bucket", "Key": _key(data), "Body": ANY, "ContentType": "image/jpeg", "ChecksumAlgorithm": ANY},
+    )
+
+    stored = asyncio.run(storage.S3StorageService().save_file(_upload(data), "payment_proofs"))
+
+    assert not stored.deduplicated
+    assert stored.size == len(data)
+
+
+def test_save_file_uses_multipart_above_threshold(s3, monkeypatch):
+    monkeypatch.setattr(settings, "s3_multipart_threshold_bytes", 5 * 1024 * 1024)
+    monkeypatch.setattr(settings, "s3_multipart_chunk_size_bytes", 5 * 1024 * 1024)
+    # S3's minimum part size is 5 MiB: 12 MiB goes up as three parts
+    data = bytes(range(256)) * (12 * 1024 * 4)
+    key = _key(data, "videos", "lecture.mp4")
+    s3.add_client_error("head_object", service_error_code="404", http_status_code=404)
+    s3.add_response("create_multipart_upload", {"UploadId": "upload-1"}, {
+        "Bucket": "test-bucket", "Key": key, "ContentType": "image/jpeg", "ChecksumAlgorithm": ANY,
+    })
+    for part in (1, 2, 3):
+        s3.add_response("upload_part", {"ETag": f'"etag-{part}"'}, {
+            "Bucket": "test-bucket", "Key": key, "UploadId": "upload-1", "PartNumber": part, "Body": ANY,
+            "ChecksumAlgorithm": ANY,
+        })
+    s3.add_response("complete_multipart_upload", {}, {
+        "Bucket": "test-bucket", "Key": key, "UploadId": "upload-1", "MultipartUpload": ANY,
+    })
+
+    stored = asyncio.run(storage.S3StorageService().save_file(_upload(data, "lecture.mp4"), "videos", max_size=len(data)))
+
+    assert stored.key == key
+    assert stored.size == len(data)
+    stats = storage.upload_metrics.stats()
+    assert stats["uploads"] == 1
+    assert stats["deduplicated"] == 0
+    assert stats["bytes"] == len(data)
+    assert stats["max_ms"] > 0
+    assert stats["throughput_bytes_per_s"] > 0
+
+
+def test_failed_upload_is_counted(s3):
+    data = b"bytes"
+    s3.add_client_error("head_object", service_error_code="AccessDenied", http_status_code=403)
+
+    with pytest.raises(ClientError):
+        asyncio.run(storage.S3StorageService().save_file(_upload(data), "payment_proofs"))
+
+    stats = storage.upload_metrics.stats()
+    assert stats["failures"] == 1
+    assert stats["uploads"] == 0
+
+
+def test_chunk_for_finished_multipart_upload_is_a_conflict(s3):
+    s3.add_client_error("upload_part", service_error_code="NoSuchUpload", http_status_code=404)
+    body = io.BytesIO(b"chunk")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(
+            storage.S3StorageService().write_chunk("videos/a.mp4", "upload-1", 0, 0, body, hashlib.sha256(b"chunk").digest())
+        )
+
+    assert exc_info.value.status_code == 409